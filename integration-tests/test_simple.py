@@ -17,7 +17,7 @@ import pytest_asyncio
 import aiohttp
 from lanraragi.client import LRRClient
 from lanraragi.docker_testing.environment import LRREnvironment
-from lanraragi.utils import compute_upload_checksum
+from lanraragi.utils import compute_upload_checksums
 from manycbz.enums import ArchivalStrategyEnum
 from manycbz.models import CreatePageRequest, WriteArchiveRequest, WriteArchiveResponse
 from manycbz.service.archive import write_archives_to_disk
@@ -106,10 +106,10 @@ async def test_archive_upload(lanraragi: LRRClient, semaphore: asyncio.Semaphore
         # archive metadata
         logger.debug("Uploading archives to server.")
         tasks = []
-        for i, _response in enumerate(write_responses):
+        checksums = compute_upload_checksums([_response.save_path for _response in write_responses])
+        for i, (_response, checksum) in enumerate(zip(write_responses, checksums)):
             title = f"Archive {i}"
             tags = ','.join(get_tag_assignments(tag_generators, generator))
-            checksum = compute_upload_checksum(_response.save_path)
             tasks.append(asyncio.create_task(
                 upload_archive(lanraragi, _response.save_path, _response.save_path.name, semaphore, title=title, tags=tags, checksum=checksum)
             ))
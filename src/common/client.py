@@ -1,5 +1,5 @@
 from contextlib import AbstractAsyncContextManager
-from typing import Union, override
+from typing import Mapping, Union, override
 
 import aiohttp
 
@@ -11,17 +11,18 @@ class AbstractAsyncHTTPContextClient(AbstractAsyncContextManager):
     Allows the use of passing custom sessions, and running `async with Client()` context.
     """
 
-    def __init__(self, session: Union[None, aiohttp.ClientSession], ssl: bool=True):
+    def __init__(self, session: Union[None, aiohttp.ClientSession], ssl: bool=True, headers: Mapping[str, str]=None):
         self.session = session
         self.ssl = ssl
+        self._session_headers = headers
         self._created_session = False
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self.session is None:
-            if not self.ssl:
-                self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False))
-            else:
-                self.session = aiohttp.ClientSession()
+            # keep idle connections alive across rate-limited call loops (e.g. plugin jobs sleeping between calls)
+            # so consecutive requests reuse the same socket instead of reconnecting.
+            connector = aiohttp.TCPConnector(ssl=self.ssl, limit=100, limit_per_host=20, keepalive_timeout=60, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector, headers=self._session_headers)
             self._created_session = True
         return self.session
 
@@ -1,26 +1,90 @@
+import asyncio
 import base64
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 import io
-import aiohttp
-import aiohttp.client_exceptions
+from aiohttp import ClientResponse, ClientSession, FormData, hdrs
 import logging
+import orjson
+import os
 from pathlib import Path
-from typing import overload, Union
+from types import MappingProxyType
+from typing import AsyncIterator, Awaitable, List, Mapping, Tuple, TypeVar, Union
+from yarl import URL
 
 from common.client import AbstractAsyncHTTPContextClient
 from lanraragi.models import LanraragiArchiveDownloadResponse, LanraragiArchiveMetadataResponse, LanraragiResponse, LanraragiServerInfoResponse
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# read size for streamed archive downloads
+_DOWNLOAD_CHUNK = 128 * 1024
+
+# max number of responses kept for ETag revalidation
+_ETAG_CACHE_SIZE = 1024
+
+# search response key -> response attribute
+_SEARCH_KEYS = (
+    ("data", "data"),
+    ("draw", "draw"),
+    ("recordsFiltered", "records_filtered"),
+    ("recordsTotal", "records_total"),
+)
+
 def build_auth_header(lrr_api_key: str) -> str:
     bearer = base64.b64encode(lrr_api_key.encode(encoding='utf-8')).decode('utf-8')
     return f"Bearer {bearer}"
 
+def _populate(response: LanraragiResponse, data: dict):
+    """
+    Copy the keys of a decoded JSON object onto the response. Does nothing if the body was not a JSON object.
+    """
+    if not isinstance(data, dict):
+        return
+    # common fields are slots on LanraragiResponse, so go through setattr rather than updating __dict__.
+    for key, value in data.items():
+        setattr(response, key, value)
+
+async def _write_chunks(async_response: ClientResponse, writer: io.IOBase):
+    """
+    Copy a response body into a writable file object, one chunk at a time.
+    """
+    async for chunk in async_response.content.iter_chunked(_DOWNLOAD_CHUNK):
+        writer.write(chunk)
+
+async def _iter_json_array(async_response: ClientResponse) -> AsyncIterator[object]:
+    """
+    Yield the items of a top-level JSON array response.
+
+    Items are decoded incrementally from the response stream if `ijson` is installed, otherwise
+    the body is buffered and decoded in one go.
+    """
+    if ijson is not None:
+        async for item in ijson.items(async_response.content, "item", use_float=True):
+            yield item
+    else:
+        for item in orjson.loads(await async_response.read()):
+            yield item
+
 class LRRClient(AbstractAsyncHTTPContextClient):
     """
     An asynchronous HTTP client for making API calls to a LANraragi server.
 
     API documentation: https://sugoi.gitbook.io/lanraragi/api-documentation/getting-started
 
+    All calls share one session and connection pool, which is closed with `close()` or on leaving
+    `async with LRRClient(...) as client:`.
+
+    Responses are requested with `Accept-Encoding: gzip, deflate` (and `br` if `brotli` is installed)
+    and decompressed transparently by aiohttp.
+
     Throws
     ------ 
     aiohttp.ClientConnectionError
@@ -30,25 +94,32 @@ class LRRClient(AbstractAsyncHTTPContextClient):
             self,
             lrr_host: str=None,
             lrr_api_key: str=None,
-            session: Union[None, aiohttp.ClientSession]=None,
-            ssl: bool=True
+            session: Union[None, ClientSession]=None,
+            ssl: bool=True,
+            max_concurrency: int=16
     ):
         if not lrr_host:
             raise KeyError("No host found for LANraragi!")
         if not lrr_host.startswith("https://") and not lrr_host.startswith("http://"):
             raise ValueError(f"lrr_host {lrr_host} must specify HTTP protocol.")
-        if not lrr_api_key:
-            raise KeyError("No API key found for LANraragi!")
         lrr_headers = {}
+        # an empty API key is allowed for LANraragi servers without authentication; no auth header is sent then.
         if lrr_api_key:
             lrr_headers["Authorization"] = build_auth_header(lrr_api_key)
 
         self.lrr_host = lrr_host
-        self.headers = lrr_headers
-        super().__init__(session, ssl=ssl)
+        self.headers = MappingProxyType(lrr_headers)
+        # bounds in-flight requests of the batch helpers (`*_many`); share one client to share the bound.
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # endpoint URLs are built on this prefix rather than through `build_url`, avoiding a call per request.
+        self._api_url = f"{lrr_host}/api"
+        self._url_plugins_use = URL(f"{self._api_url}/plugins/use")
+        # URL -> (ETag, decoded body) of the most recently used GET responses
+        self._etag_cache: OrderedDict[str, Tuple[str, object]] = OrderedDict()
+        super().__init__(session, ssl=ssl, headers=self.headers)
 
     @classmethod
-    async def default_client(cls, session: Union[None, aiohttp.ClientSession]=None) -> "LRRClient":
+    async def default_client(cls, session: Union[None, ClientSession]=None) -> "LRRClient":
         """
         Return the default LANraragi client by trying out local and global configuration targets.
         """
@@ -67,15 +138,79 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         return f"{self.lrr_host}{api}"
 
+    @property
+    def _request_headers(self) -> Union[None, Mapping[str, str]]:
+        # sessions created by the client already send the auth header; only external sessions need it per request.
+        return None if self._created_session else self.headers
+
+    async def _bounded(self, coro: Awaitable[T]) -> T:
+        async with self._semaphore:
+            return await coro
+
+    async def _request(
+            self, method: str, url: Union[str, URL], response: LanraragiResponse,
+            params: Mapping[str, object]=None, data: FormData=None
+    ) -> object:
+        """
+        Send a request and return the decoded JSON body, setting the status on `response`.
+
+        If the body is not JSON, the failure is logged, the raw body is kept as `response.error` and None is returned.
+        """
+        async with (await self._get_session()).request(method, url, params=params, data=data, headers=self._request_headers) as async_response:
+            response.status_code = async_response.status
+            response.success = 1 if async_response.status == 200 else 0
+            body = await async_response.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            logger.exception("[%s %s] Failed to decode JSON response", method, url)
+            response.error = body.decode(errors="replace")
+            return None
+
+    async def _cached_get(self, url: str, response: LanraragiResponse) -> object:
+        """
+        GET a JSON endpoint and return the decoded body, setting the status on `response`.
+
+        If the server sends an ETag, the decoded body is kept and revalidated with `If-None-Match` on the
+        next call to the same URL; a `304 Not Modified` returns the kept body as a 200 without downloading
+        or decoding it again. Bodies returned from the cache are shared between calls and should not be mutated.
+
+        Throws
+        ------
+        orjson.JSONDecodeError if the response body is not JSON.
+        """
+        headers = self._request_headers
+        cached = self._etag_cache.get(url)
+        if cached:
+            headers = {**(headers or {}), "If-None-Match": cached[0]}
+        async with (await self._get_session()).get(url=url, headers=headers) as async_response:
+            if cached and async_response.status == 304:
+                self._etag_cache.move_to_end(url)
+                response.status_code = 200
+                response.success = 1
+                return cached[1]
+            response.status_code = async_response.status
+            response.success = 1 if async_response.status == 200 else 0
+            data = orjson.loads(await async_response.read())
+            etag = async_response.headers.get("ETag")
+            if response.success and etag:
+                self._etag_cache[url] = (etag, data)
+                self._etag_cache.move_to_end(url)
+                if len(self._etag_cache) > _ETAG_CACHE_SIZE:
+                    self._etag_cache.popitem(last=False)
+            elif cached:
+                del self._etag_cache[url]
+            return data
+
     # ---- START SEARCH API ----
     # https://sugoi.gitbook.io/lanraragi/api-documentation/search-api
     async def search_archive_index(self, category: str=None, search_filter: str=None, start: str=None, sortby: str=None, order: str=None) -> LanraragiResponse:
         """
         `GET /api/search`
         """
-        url = self.build_url("/api/search")
+        url = f"{self._api_url}/search"
         response = LanraragiResponse()
-        form_data = aiohttp.FormData(quote_fields=False)
+        params = {}
         for key, value in [
             ("category", category),
             ("filter", search_filter),
@@ -84,60 +219,73 @@ class LRRClient(AbstractAsyncHTTPContextClient):
             ("order", order)
         ]:
             if value:
-                form_data.add_field(key, value)
-
-        async with (await self._get_session()).get(url=url, data=form_data, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                response_j = await async_response.json()
-                response.data = response_j.get("data")
-                response.draw = response_j.get("draw")
-                response.records_filtered = response_j.get("recordsFiltered")
-                response.records_total = response_j.get("recordsTotal")
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[search] Failed to decode JSON response: ", content_type_error)
-            return response
+                params[key] = value
+        response_j = await self._request("GET", url, response, params=params)
+        if response_j is not None:
+            for key, attribute in _SEARCH_KEYS:
+                setattr(response, attribute, response_j.get(key))
+        return response
+
+    async def stream_search_pages(self, category: str=None, search_filter: str=None, sortby: str=None, order: str=None) -> AsyncIterator[LanraragiResponse]:
+        """
+        `GET /api/search`, one page at a time.
+
+        Yields the `search_archive_index` response of each page in order. The next page is requested
+        while the current one is being processed. Iteration stops after the last page, or after the first
+        unsuccessful response (which is yielded so the caller can inspect it).
+        """
+        def fetch_page(start: int) -> asyncio.Task:
+            return asyncio.create_task(self.search_archive_index(
+                category=category, search_filter=search_filter, start=str(start), sortby=sortby, order=order
+            ))
+
+        start = 0
+        next_page = fetch_page(start)
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                if not page.success:
+                    yield page
+                    return
+                if not page.data:
+                    return
+                start += len(page.data)
+                if page.records_filtered is None or start < int(page.records_filtered):
+                    next_page = fetch_page(start)
+                yield page
+        finally:
+            # the consumer stopped early; don't leave the prefetched request running.
+            if next_page is not None:
+                next_page.cancel()
 
     async def search_random_archives(self, category: str=None, search_filter: str=None, count: int=None):
         """
         `GET /api/search/random`
         """
-        url = self.build_url("/api/search/random")
+        url = f"{self._api_url}/search/random"
         response = LanraragiResponse()
-        form_data = aiohttp.FormData(quote_fields=False)
+        params = {}
         for key, value in [
             ("category", category),
             ("filter", search_filter),
             ("count", count)
         ]:
             if value:
-                form_data.add_field(key, value)
-        async with (await self._get_session()).get(url=url, data=form_data, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                response.data = (await async_response.json()).get("data")
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[search] Failed to decode JSON response: ", content_type_error)
-            return response
+                params[key] = value
+        response_j = await self._request("GET", url, response, params=params)
+        if response_j is not None:
+            response.data = response_j.get("data")
+        return response
 
     async def discard_search_cache(self) -> LanraragiResponse:
         """
         `DELETE /api/search/cache`
         """
-        url = self.build_url("/api/search/cache")
+        url = f"{self._api_url}/search/cache"
         response = LanraragiResponse()
-        async with (await self._get_session()).delete(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[clear_cache] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("DELETE", url, response))
+        return response
 
     # ---- END SEARCH API ----
 
@@ -147,42 +295,66 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         `GET /api/archives`
         """
-        url = self.build_url("/api/archives")
+        url = f"{self._api_url}/archives"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            response.data = await async_response.json()
-            return response
+        response.data = await self._cached_get(url, response)
+        return response
+
+    async def iter_all_archives(self) -> AsyncIterator[dict]:
+        """
+        `GET /api/archives`
+
+        Streaming variant of `get_all_archives` which yields archives one at a time, for walking large libraries
+        without holding the whole index in memory.
+        """
+        url = f"{self._api_url}/archives"
+        async with (await self._get_session()).get(url=url, headers=self._request_headers) as async_response:
+            if async_response.status != 200:
+                logger.error("[iter_all_archives] Failed to get archives: %s", async_response.status)
+                return
+            async for archive in _iter_json_array(async_response):
+                yield archive
 
     async def get_untagged_archives(self) -> LanraragiResponse:
         """
         `GET /api/archives/untagged`
         """
-        url = self.build_url("/api/archives/untagged")
+        url = f"{self._api_url}/archives/untagged"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            response.data = await async_response.json()
-            return response
+        response.data = await self._request("GET", url, response)
+        return response
 
     async def get_archive_metadata(self, archive_id: str) -> LanraragiArchiveMetadataResponse:
         """
         `GET /api/archives/:id/metadata`
         """
-        url = self.build_url(f"/api/archives/{archive_id}/metadata")
+        url = f"{self._api_url}/archives/{archive_id}/metadata"
         response = LanraragiArchiveMetadataResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
+        try:
+            data = await self._cached_get(url, response)
+            _populate(response, data)
+        except orjson.JSONDecodeError:
+            logger.exception("[get_archive_metadata] Failed to decode JSON response")
+        return response
+
+    @asynccontextmanager
+    async def _open_download(self, archive_id: str, response: LanraragiResponse) -> AsyncIterator[ClientResponse]:
+        """
+        Open the download of an Archive and yield the unread response, or None if the server returned an error.
+        """
+        url = f"{self._api_url}/archives/{archive_id}/download"
+        async with (await self._get_session()).get(url=url, headers=self._request_headers) as async_response:
             response.status_code = async_response.status
             response.success = 1 if async_response.status == 200 else 0
+            if response.success:
+                yield async_response
+                return
             try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_archive_metadata] Failed to decode JSON response: ", content_type_error)
-            return response
+                data = orjson.loads(await async_response.read())
+                _populate(response, data)
+            except orjson.JSONDecodeError:
+                logger.exception("[download_archive] Failed to decode JSON response")
+            yield None
 
     async def download_archive(self, archive_id: str) -> LanraragiArchiveDownloadResponse:
         """
@@ -196,49 +368,58 @@ class LRRClient(AbstractAsyncHTTPContextClient):
             writer.write(data.getvalue())
         ```
         """
-        url = self.build_url(f"/api/archives/{archive_id}/download")
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            buffer = io.BytesIO()
-            if response.success:
-                while True:
-                    chunk = await async_response.content.read(1024)
-                    if not chunk:
-                        break
-                    buffer.write(chunk)
+        async with self._open_download(archive_id, response) as async_response:
+            if async_response is not None:
+                buffer = io.BytesIO()
+                # reserve the full size up front so the buffer is not regrown and copied as chunks arrive.
+                # Content-Length is the encoded size when the body is compressed, so it is only trusted without one.
+                content_length = async_response.content_length
+                if content_length and hdrs.CONTENT_ENCODING not in async_response.headers:
+                    buffer.seek(content_length - 1)
+                    buffer.write(b"\0")
+                    buffer.seek(0)
+                await _write_chunks(async_response, buffer)
+                buffer.truncate()
                 buffer.seek(0)
                 response.data = buffer
-            else:
+        return response
+
+    async def download_archive_to(self, archive_id: str, dest: Union[Path, str]) -> LanraragiResponse:
+        """
+        `GET /api/archives/:id/download`
+
+        Stream an Archive straight to `dest` without holding it in memory. The body is written to a sibling
+        `.part` file which is only moved onto `dest` once the download completes, so a failed download never
+        leaves a truncated archive at `dest`.
+        """
+        response = LanraragiResponse()
+        dest = Path(dest)
+        part = dest.with_suffix(dest.suffix + ".part")
+        async with self._open_download(archive_id, response) as async_response:
+            if async_response is not None:
                 try:
-                    data = await async_response.json()
-                    for key in data:
-                        response.__setattr__(key, data[key])
-                except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                    logger.error("[download_archive] Failed to decode JSON response: ", content_type_error)
-            return response
+                    with open(part, 'wb') as writer:
+                        await _write_chunks(async_response, writer)
+                    os.replace(part, dest)
+                except BaseException:
+                    part.unlink(missing_ok=True)
+                    raise
+        return response
 
-    @overload
-    async def upload_archive(
-        self, archive_path: str, archive_filename: str, archive_checksum: str=None, 
-        title: str=None, tags: str=None, summary: str=None, category_id: str=None
-    ) -> LanraragiResponse:
-        ...
-    
-    @overload
-    async def upload_archive(
-        self, archive_path: Path, archive_filename: str, archive_checksum: str=None, 
-        title: str=None, tags: str=None, summary: str=None, category_id: str=None
-    ) -> LanraragiResponse:
-        ...
+    async def get_archive_metadata_many(self, archive_ids: List[str]) -> List[LanraragiArchiveMetadataResponse]:
+        """
+        Get the metadata of many Archives concurrently, with at most `max_concurrency` requests in flight.
+        """
+        return await asyncio.gather(*(self._bounded(self.get_archive_metadata(archive_id)) for archive_id in archive_ids))
 
-    @overload
-    async def upload_archive(
-        self, archive_io: io.IOBase, archive_filename: str, archive_checksum: str=None, 
-        title: str=None, tags: str=None, summary: str=None, category_id: str=None
-    ) -> LanraragiResponse:
-        ...
+    async def download_archive_many(self, archive_ids: List[str]) -> List[LanraragiArchiveDownloadResponse]:
+        """
+        Download many Archives concurrently, with at most `max_concurrency` downloads in flight.
+
+        All downloads are held in memory; use `download_archive_to` in a loop for large batches.
+        """
+        return await asyncio.gather(*(self._bounded(self.download_archive(archive_id)) for archive_id in archive_ids))
 
     async def upload_archive(
             self, archive: Union[Path, str, io.IOBase], archive_filename: str, archive_checksum: str=None,
@@ -246,67 +427,65 @@ class LRRClient(AbstractAsyncHTTPContextClient):
     ) -> LanraragiResponse:
         """
         `PUT /api/archives/upload`
+
+        The archive is streamed from the file object: aiohttp reads it in 64 KiB chunks in an executor,
+        so large uploads do not block the event loop and are never held in memory in full.
         """
         if isinstance(archive, (Path, str)):
-            with open(archive, 'rb') as archive_br:
-                return await self.upload_archive(
-                    archive_br, archive_filename, archive_checksum=archive_checksum, 
+            # opening can stall on slow or network filesystems, so keep it off the event loop as well.
+            archive_br = await asyncio.to_thread(open, archive, 'rb')
+            try:
+                return await self._upload_archive(
+                    archive_br, archive_filename, archive_checksum=archive_checksum,
                     title=title, tags=tags, summary=summary, category_id=category_id
                 )
+            finally:
+                archive_br.close()
         elif isinstance(archive, io.IOBase):
-            url = self.build_url("/api/archives/upload")
-            response = LanraragiResponse()
-            form_data = aiohttp.FormData(quote_fields=False)
-            form_data.add_field('file', archive, filename=archive_filename, content_type='application/octet-stream')
-            if archive_checksum:
-                form_data.add_field("file_checksum", archive_checksum)
-            if title:
-                form_data.add_field('title', title)
-            if tags:
-                form_data.add_field('tags', tags)
-            if summary:
-                form_data.add_field('summary', summary)
-            if category_id:
-                form_data.add_field('category_id', category_id)
-            async with (await self._get_session()).put(url=url, data=form_data, headers=self.headers) as async_response:
-                response.status_code = async_response.status
-                response.success = 1 if async_response.status == 200 else 0
-                try:
-                    data = await async_response.json()
-                    for key in data:
-                        response.__setattr__(key, data[key])
-                except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                    logger.error("[upload_archive] Failed to decode JSON response: ", content_type_error)
-                    response.error = async_response.text
-                return response
+            return await self._upload_archive(
+                archive, archive_filename, archive_checksum=archive_checksum,
+                title=title, tags=tags, summary=summary, category_id=category_id
+            )
         else:
             raise TypeError(f"Unsupported upload content type (must be Path, str or IOBase): {type(archive)}")
 
+    async def _upload_archive(
+            self, archive: io.IOBase, archive_filename: str, archive_checksum: str=None,
+            title: str=None, tags: str=None, summary: str=None, category_id: str=None,
+    ) -> LanraragiResponse:
+        url = f"{self._api_url}/archives/upload"
+        response = LanraragiResponse()
+        form_data = FormData(quote_fields=False)
+        form_data.add_field('file', archive, filename=archive_filename, content_type='application/octet-stream')
+        if archive_checksum:
+            form_data.add_field("file_checksum", archive_checksum)
+        if title:
+            form_data.add_field('title', title)
+        if tags:
+            form_data.add_field('tags', tags)
+        if summary:
+            form_data.add_field('summary', summary)
+        if category_id:
+            form_data.add_field('category_id', category_id)
+        _populate(response, await self._request("PUT", url, response, data=form_data))
+        return response
+
     async def update_archive(self, archive_id: str, title: str=None, tags: str=None, summary: str=None):
         """
         `PUT /api/archives/:id/metadata`
         """
         if isinstance(tags, str):
-            url = self.build_url(f"/api/archives/{archive_id}/metadata")
+            url = f"{self._api_url}/archives/{archive_id}/metadata"
             response = LanraragiResponse()
-            form_data = aiohttp.FormData(quote_fields=False)
+            form_data = FormData(quote_fields=False)
             if title:
                 form_data.add_field('title', title)
             if tags:
                 form_data.add_field('tags', tags)
             if summary:
                 form_data.add_field('summary', summary)
-            async with (await self._get_session()).put(url=url, headers=self.headers, data=form_data) as async_response:
-                response.status_code = async_response.status
-                response.success = 1 if async_response.status == 200 else 0
-                try:
-                    data = await async_response.json()
-                    for key in data:
-                        response.__setattr__(key, data[key])
-                except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                    logger.error("[update_archive] Failed to update Archive: ", content_type_error)
-                    response.error = async_response.text
-                return response
+            _populate(response, await self._request("PUT", url, response, data=form_data))
+            return response
         else:
             raise TypeError(f"Unsupported type for tags: {type(tags)}")
 
@@ -314,18 +493,10 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         `DELETE /api/archives/:id`
         """
-        url = self.build_url(f"/api/archives/{archive_id}")
+        url = f"{self._api_url}/archives/{archive_id}"
         response = LanraragiResponse()
-        async with (await self._get_session()).delete(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[delete_archive] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("DELETE", url, response))
+        return response
 
     # ---- END ARCHIVE API ----
 
@@ -334,81 +505,47 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         `GET /api/database/stats`
         """
-        url = self.build_url("/api/database/stats")
+        url = f"{self._api_url}/database/stats"
         response = LanraragiResponse()
-        form_data = aiohttp.FormData(quote_fields=False)
-        form_data.add_field('minweight', minweight)
-        async with (await self._get_session()).get(url=url, data=form_data, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                response.data = await async_response.json()
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_database_stats] Failed to get database stats: ", content_type_error)
-            return response
+        params = {"minweight": minweight}
+        response.data = await self._request("GET", url, response, params=params)
+        return response
 
     async def clean_database(self) -> LanraragiResponse:
         """
         `POST /api/database/clean`
         """
-        url = self.build_url("/api/database/clean")
+        url = f"{self._api_url}/database/clean"
         response = LanraragiResponse()
-        async with (await self._get_session()).post(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[clean_database] Failed to clean database: ", content_type_error)
-            return response
+        _populate(response, await self._request("POST", url, response))
+        return response
 
     async def drop_database(self) -> LanraragiResponse:
         """
         `POST /api/database/drop`
         """
-        url = self.build_url("/api/database/drop")
+        url = f"{self._api_url}/database/drop"
         response = LanraragiResponse()
-        async with (await self._get_session()).post(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[drop_database] Failed to drop database: ", content_type_error)
-            return response
+        _populate(response, await self._request("POST", url, response))
+        return response
 
     async def get_backup(self) -> LanraragiResponse:
         """
         `GET /api/database/backup`
         """
-        url = self.build_url("/api/database/backup")
+        url = f"{self._api_url}/database/backup"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            response.data = await async_response.json()
-            return response
+        response.data = await self._request("GET", url, response)
+        return response
 
     async def clear_new_all(self) -> LanraragiResponse:
         """
         `DELETE /api/database/isnew`
         """
-        url = self.build_url("/api/database/isnew")
+        url = f"{self._api_url}/database/isnew"
         response = LanraragiResponse()
-        async with (await self._get_session()).delete(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[clear_new_all] Failed to clear new flag on Archives: ", content_type_error)
-            return response
+        _populate(response, await self._request("DELETE", url, response))
+        return response
 
     # ---- END DATABASE API ----
 
@@ -418,163 +555,101 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         `GET /api/categories`
         """
-        url = self.build_url("/api/categories")
+        url = f"{self._api_url}/categories"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                response.data = await async_response.json()
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_categories] Failed to decode JSON response: ", content_type_error)
-            return response
+        try:
+            response.data = await self._cached_get(url, response)
+        except orjson.JSONDecodeError:
+            logger.exception("[get_categories] Failed to decode JSON response")
+        return response
 
     async def get_category(self, category_id: str) -> LanraragiResponse:
         """
         `GET /api/categories/:id`
         """
-        url = self.build_url(f"/api/categories/{category_id}")
+        url = f"{self._api_url}/categories/{category_id}"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                response.data = await async_response.json()
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_category] Failed to decode JSON response: ", content_type_error)
-            return response
+        try:
+            response.data = await self._cached_get(url, response)
+        except orjson.JSONDecodeError:
+            logger.exception("[get_category] Failed to decode JSON response")
+        return response
 
     async def create_category(self, name: str, search: str=None, pinned: bool=None):
         """
         `PUT /api/categories`
         """
-        url = self.build_url("/api/categories")
+        url = f"{self._api_url}/categories"
         response = LanraragiResponse()
-        form_data = aiohttp.FormData(quote_fields=False)
+        form_data = FormData(quote_fields=False)
         form_data.add_field('name', name)
         if search:
             form_data.add_field('search', search)
         if pinned:
             form_data.add_field('pinned', pinned)
-        async with (await self._get_session()).put(url=url, data=form_data, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[create_category] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("PUT", url, response, data=form_data))
+        return response
 
     async def update_category(self, category_id: str, name: str=None, search: str=None, pinned: bool=None):
         """
         `PUT /api/categories/:id`
         """
-        url = self.build_url(f"/api/categories/{category_id}")
+        url = f"{self._api_url}/categories/{category_id}"
         response = LanraragiResponse()
-        form_data = aiohttp.FormData(quote_fields=False)
+        form_data = FormData(quote_fields=False)
         if name:
             form_data.add_field('name', name)
         if search:
             form_data.add_field('search', search)
         if pinned:
             form_data.add_field('pinned', pinned)
-        async with (await self._get_session()).put(url=url, data=form_data, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[update_category] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("PUT", url, response, data=form_data))
+        return response
 
     async def delete_category(self, category_id: str):
         """
         `DELETE /api/categories/:id`
         """
-        url = self.build_url(f"/api/categories/{category_id}")
+        url = f"{self._api_url}/categories/{category_id}"
         response = LanraragiResponse()
-        async with (await self._get_session()).delete(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[delete_category] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("DELETE", url, response))
+        return response
         
     async def add_archive_to_category(self, category_id: str, archive_id: str) -> LanraragiResponse:
         """
         `PUT /api/categories/:id/:archive`
         """
-        url = self.build_url(f"/api/categories/{category_id}/{archive_id}")
+        url = f"{self._api_url}/categories/{category_id}/{archive_id}"
         response = LanraragiResponse()
-        async with (await self._get_session()).put(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[add_archive_to_category] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("PUT", url, response))
+        return response
 
     async def get_bookmark_link(self) -> LanraragiResponse:
         """
         `GET /api/categories/bookmark_link`
         """
-        url = self.build_url("/api/categories/bookmark_link")
+        url = f"{self._api_url}/categories/bookmark_link"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_bookmark_link] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("GET", url, response))
+        return response
 
     async def update_bookmark_link(self, category_id: str) -> LanraragiResponse:
         """
         `PUT /api/categories/bookmark_link/:id`
         """
-        url = self.build_url(f"/api/categories/bookmark_link/{category_id}")
+        url = f"{self._api_url}/categories/bookmark_link/{category_id}"
         response = LanraragiResponse()
-        async with (await self._get_session()).put(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[update_bookmark_link] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("PUT", url, response))
+        return response
 
     async def remove_bookmark_link(self):
         """
         `DELETE /api/categories/bookmark_link`
         """
-        url = self.build_url("/api/categories/bookmark_link")
+        url = f"{self._api_url}/categories/bookmark_link"
         response = LanraragiResponse()
-        async with (await self._get_session()).delete(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[remove_bookmark_link] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("DELETE", url, response))
+        return response
 
     # ---- END CATEGORY API ----
 
@@ -584,52 +659,28 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         `GET /api/shinobu`
         """
-        url = self.build_url("/api/shinobu")
+        url = f"{self._api_url}/shinobu"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_shinobu_status] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("GET", url, response))
+        return response
 
     async def stop_shinobu(self) -> LanraragiResponse:
         """
         `POST /api/shinobu/stop`
         """
-        url = self.build_url("/api/shinobu/stop")
+        url = f"{self._api_url}/shinobu/stop"
         response = LanraragiResponse()
-        async with (await self._get_session()).post(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[shinobu_stop] Failed to stop shinobu: ", content_type_error)
-            return response
+        _populate(response, await self._request("POST", url, response))
+        return response
 
     async def restart_shinobu(self) -> LanraragiResponse:
         """
         `POST /api/shinobu/restart`
         """
-        url = self.build_url("/api/shinobu/restart")
+        url = f"{self._api_url}/shinobu/restart"
         response = LanraragiResponse()
-        async with (await self._get_session()).post(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[shinobu_restart] Failed to restart shinobu: ", content_type_error)
-            return response
+        _populate(response, await self._request("POST", url, response))
+        return response
 
     # ---- END SHINOBU API ----
 
@@ -639,92 +690,83 @@ class LRRClient(AbstractAsyncHTTPContextClient):
         """
         `GET /api/info`
         """
-        url = self.build_url("/api/info")
+        url = f"{self._api_url}/info"
         response = LanraragiServerInfoResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_server_info] Failed to decode JSON response: ", content_type_error)
-            return response
+        try:
+            data = await self._cached_get(url, response)
+            _populate(response, data)
+        except orjson.JSONDecodeError:
+            logger.exception("[get_server_info] Failed to decode JSON response")
+        return response
 
     async def get_available_plugins(self, plugin_type: str) -> LanraragiResponse:
         """
         `GET /api/plugins/:type`
         """
-        url = self.build_url(f"/api/plugins/{plugin_type}")
+        url = f"{self._api_url}/plugins/{plugin_type}"
         response = LanraragiResponse()
-        async with (await self._get_session()).get(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                response.data = await async_response.json()
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[get_available_plugins] Failed to decode JSON response: ", content_type_error)
-            return response
+        try:
+            response.data = await self._cached_get(url, response)
+        except orjson.JSONDecodeError:
+            logger.exception("[get_available_plugins] Failed to decode JSON response")
+        return response
+
+    async def iter_available_plugins(self, plugin_type: str) -> AsyncIterator[dict]:
+        """
+        `GET /api/plugins/:type`
+
+        Streaming variant of `get_available_plugins` which yields plugins one at a time.
+        """
+        url = f"{self._api_url}/plugins/{plugin_type}"
+        async with (await self._get_session()).get(url=url, headers=self._request_headers) as async_response:
+            if async_response.status != 200:
+                logger.error("[iter_available_plugins] Failed to get plugins: %s", async_response.status)
+                return
+            async for plugin in _iter_json_array(async_response):
+                yield plugin
 
-    async def use_plugin(self, plugin: str, arcid: str=None, arg: str=None):
+    async def use_plugin(self, plugin: str, arcid: str=None, arg: str=None, out: LanraragiResponse=None) -> LanraragiResponse:
         """
         `POST /api/plugins/use`
+
+        Callers that process and discard results in a loop can pass the previous response as `out`
+        to have it overwritten in place instead of allocating a new one.
         """
-        url = self.build_url("/api/plugins/use")
-        query = f"?plugin={plugin}"
+        params = {"plugin": plugin}
         if arcid:
-            query += f"&id={arcid}"
+            params["id"] = arcid
         if arg:
-            query += f"&arg={arg}"
-        url = url + query
-
-        response = LanraragiResponse()
-        async with (await self._get_session()).post(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            try:
-                response_obj = await async_response.json()
-                response.data = response_obj.get("data")
-                response.success = response_obj.get("success")
-                response.operation = "use_plugin"
-                response.error = response_obj.get("error")
-                response.type = response_obj.get("type")
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[use_plugin] Failed to decode JSON response: ", content_type_error)
-            return response
+            params["arg"] = arg
+
+        response = out if out is not None else LanraragiResponse()
+        response.data = response.error = response.type = None
+        response_obj = await self._request("POST", self._url_plugins_use, response, params=params)
+        # plugin success is reported in the body, not by the status code.
+        response.success = None
+        if response_obj is not None:
+            response.data = response_obj.get("data")
+            response.success = response_obj.get("success")
+            response.operation = "use_plugin"
+            response.error = response_obj.get("error")
+            response.type = response_obj.get("type")
+        return response
 
     async def clean_tempfolder(self):
         """
         `DELETE /api/tempfolder`
         """
-        url = self.build_url("/api/tempfolder")
+        url = f"{self._api_url}/tempfolder"
         response = LanraragiResponse()
-        async with (await self._get_session()).delete(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[cleantemp] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("DELETE", url, response))
+        return response
 
     async def regenerate_thumbnails(self):
         """
         `POST /api/regen_thumbs`
         """
-        url = self.build_url("/api/regen_thumbs")
+        url = f"{self._api_url}/regen_thumbs"
         response = LanraragiResponse()
-        async with (await self._get_session()).post(url=url, headers=self.headers) as async_response:
-            response.status_code = async_response.status
-            response.success = 1 if async_response.status == 200 else 0
-            try:
-                data = await async_response.json()
-                for key in data:
-                    response.__setattr__(key, data[key])
-            except aiohttp.client_exceptions.ContentTypeError as content_type_error:
-                logger.error("[cleantemp] Failed to decode JSON response: ", content_type_error)
-            return response
+        _populate(response, await self._request("POST", url, response))
+        return response
 
     # ---- END MISC API ----
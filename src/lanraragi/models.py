@@ -2,16 +2,22 @@ import io
 
 
 class LanraragiResponse:
-    
+
+    # common fields are slot-backed; __dict__ is kept for the arbitrary keys copied over from API responses.
+    __slots__ = ("success", "status_code", "message", "error", "data", "operation", "type", "__dict__")
+
     success: int
     status_code: int
     message: str
     error: str
     data: object
     operation: str
+    type: str
 
     def __repr__(self) -> str:
-        return str(self.__dict__)
+        fields = {slot: getattr(self, slot) for slot in LanraragiResponse.__slots__ if slot != "__dict__" and hasattr(self, slot)}
+        fields.update(self.__dict__)
+        return str(fields)
 
 class LanraragiArchiveMetadataResponse(LanraragiResponse):
 
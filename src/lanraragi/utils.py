@@ -1,10 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import hashlib
 import io
+import mmap
+import os
 from pathlib import Path
-from typing import List, overload, Union
+from typing import Iterable, List, overload, Union
 
 from lanraragi.constants import ALLOWED_SIGNATURES, NULL_ARCHIVE_ID
 
+# SHA1 is only used to identify archives and check their integrity, never for security,
+# so mark it as such to keep it available on FIPS-restricted builds.
+_sha1 = functools.partial(hashlib.sha1, usedforsecurity=False)
+# bytes read per call when hashing a stream.
+_CHECKSUM_CHUNK = 1 << 20
 
 @overload
 def compute_upload_checksum(br: io.IOBase) -> str:
@@ -21,17 +30,19 @@ def compute_upload_checksum(file_path: str) -> str:
 def compute_upload_checksum(file: Union[io.IOBase, Path, str]) -> str:
     """
     Compute the SHA1 hash of an Archive before an upload for in-transit integrity checks.
+
+    A stream is hashed from its current position to its end.
     """
-    sha1 = hashlib.sha1()
     if isinstance(file, io.IOBase):
-        while chunk := file.read(8192):
+        # read in chunks rather than through `hashlib.file_digest`, which hashes a `BytesIO` from its start
+        # and needs `readinto`, which not every stream has.
+        sha1 = _sha1()
+        while chunk := file.read(_CHECKSUM_CHUNK):
             sha1.update(chunk)
         return sha1.hexdigest()
     elif isinstance(file, (Path, str)):
         with open(file, 'rb') as file_br:
-            while chunk := file_br.read(8192):
-                sha1.update(chunk)
-            return sha1.hexdigest()
+            return hashlib.file_digest(file_br, _sha1).hexdigest()
     else:
         raise TypeError(f"Unsupported file type {type(file)}")
 
@@ -50,11 +61,13 @@ def compute_archive_id(file_path: Union[Path, str]) -> str:
     """
     if isinstance(file_path, (Path, str)):
         with open(file_path, 'rb') as fb:
-            data = fb.read(512000)
-        
-        sha1 = hashlib.sha1()
-        sha1.update(data)
-        digest = sha1.hexdigest()
+            size = os.fstat(fb.fileno()).st_size
+            if size:
+                # hash straight from the page cache instead of copying the header into a bytes object.
+                with mmap.mmap(fb.fileno(), min(size, 512000), access=mmap.ACCESS_READ) as header:
+                    digest = _sha1(header).hexdigest()
+            else:
+                digest = NULL_ARCHIVE_ID
         if digest == NULL_ARCHIVE_ID:
             raise ValueError("Computed ID is for a null value, invalid source file.")
         return digest
@@ -62,6 +75,23 @@ def compute_archive_id(file_path: Union[Path, str]) -> str:
         raise TypeError(f"Unsupported type: {type(file_path)}")
 
 
+def compute_upload_checksums(files: Iterable[Union[Path, str]], max_workers: int=None) -> List[str]:
+    """
+    Compute the upload checksums of many Archives on a thread pool.
+
+    Reads and hashing release the GIL, so the disk read of one Archive overlaps with hashing another.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(compute_upload_checksum, files))
+
+def compute_archive_ids(file_paths: Iterable[Union[Path, str]], max_workers: int=None) -> List[str]:
+    """
+    Compute the IDs of many files on a thread pool, in the same order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(compute_archive_id, file_paths))
+
+
 def get_source_from_tags(tags: str) -> Union[str, None]:
     """
     Return the source from tags if exists, else None.
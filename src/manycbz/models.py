@@ -20,6 +20,7 @@ class Page:
     image: Image.Image
     first_n_bytes = int
     image_format: str
+    compress_level: int
     text: str
     filename: str
 
@@ -32,6 +33,9 @@ class CreatePageRequest:
     """
     Request to create a Page object, which contains an Image object
     in memory.
+
+    compress_level: zlib level (0-9) used when saving as PNG. Synthetic pages are mostly flat color,
+    so the default fast level 1 is barely larger than Pillow's default of 6 and several times faster.
     """
 
     def __init__(
@@ -39,7 +43,8 @@ class CreatePageRequest:
             background_color: Union[str, Tuple[int, int, int]]=LIGHT_GRAY,
             first_n_bytes: int=None,
             image_format: str='PNG',
-            text: str=None
+            text: str=None,
+            compress_level: int=1
     ):
         self.width = width
         self.height = height
@@ -48,6 +53,7 @@ class CreatePageRequest:
         self.first_n_bytes = first_n_bytes
         self.image_format = image_format
         self.text = text
+        self.compress_level = compress_level
 
 class CreatePageResponseStatus:
     SUCCESS = 0
@@ -65,16 +71,22 @@ class WriteArchiveRequest:
     """
     Request to write to an archive on disk based on a sequence of create
     page requests.
+
+    compress_level: compression level of the archive itself (zlib level for ZIP and tar.gz, preset for tar.xz).
+    If set, PNG pages are left uncompressed so the archive does the only compression pass. By default ZIP
+    archives store pages as-is and tarballs use the codec's default level.
     """
 
     def __init__(
         self, create_page_requests: List[CreatePageRequest],
         save_path: Path,
         archival_strategy: ArchivalStrategyEnum=ArchivalStrategyEnum.ZIP,
+        compress_level: int=None,
     ):
         self.create_page_requests = create_page_requests
         self.save_path = save_path
         self.archival_strategy = archival_strategy
+        self.compress_level = compress_level
 
 class WriteArchiveResponseStatus:
     SUCCESS = 0
@@ -1,22 +1,28 @@
 
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import io
 import logging
 import multiprocessing
 from pathlib import Path
 import tarfile
-import tempfile
-from typing import List, Union
+import time
+from typing import Iterator, List, Tuple, Union
 
 import zipfile
 from manycbz.enums import ArchivalStrategyEnum
 from manycbz.models import CreatePageRequest, WriteArchiveRequest, WriteArchiveResponse, WriteArchiveResponseStatus
-from manycbz.service.page import save_page_to_dir
+from manycbz.service.page import get_page_bytes, save_page_to_dir
 
 logger = logging.getLogger("manycbz")
 
-def write_archive_to_disk(request: WriteArchiveRequest) -> WriteArchiveResponse:
+def write_archive_to_disk(request: WriteArchiveRequest, num_workers: int=1) -> WriteArchiveResponse:
     """
     Writes an archive to disk from a request.
+
+    With more than one worker, pages are rendered in parallel in a process pool. This cannot be used
+    from a daemonic process (such as a `multiprocessing.Pool` worker), which may not have children.
     """
     response = WriteArchiveResponse()
     create_page_requests = request.create_page_requests
@@ -33,8 +39,14 @@ def write_archive_to_disk(request: WriteArchiveRequest) -> WriteArchiveResponse:
     if strategy == ArchivalStrategyEnum.NO_ARCHIVE:
         try:
             save_path.mkdir(parents=True, exist_ok=True)
-            for create_page_request in create_page_requests:
-                save_page_to_dir(create_page_request, save_path)
+            if num_workers > 1:
+                with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                    # consume the results so that errors from workers are raised here.
+                    for _ in executor.map(partial(save_page_to_dir, save_dir=save_path), create_page_requests):
+                        pass
+            else:
+                for create_page_request in create_page_requests:
+                    save_page_to_dir(create_page_request, save_path)
             response.status = WriteArchiveResponseStatus.SUCCESS
             response.save_path = save_path
             return response
@@ -43,39 +55,62 @@ def write_archive_to_disk(request: WriteArchiveRequest) -> WriteArchiveResponse:
             response.error = str(e)
             return response
 
-    # All other strategies involve creating a temp directory, creating images in that tempdir,
-    # then moving these images into the appropriate compressed file.
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_save_dir = Path(tmpdir)
-        request.archival_strategy = ArchivalStrategyEnum.NO_ARCHIVE
-        request.save_path = tmp_save_dir
-        response = write_archive_to_disk(request)
-        if response.status == WriteArchiveResponseStatus.FAILURE:
-            logger.error(f"Failed to write pages to disk due to error: {response.error}")
-            return response
+    # All other strategies render each page in memory and write it straight into the archive.
+    # PNG pages are already deflated, so a ZIP only stores them, while gz/xz tarballs get raw PNGs
+    # and leave all of the compression to the outer codec.
+    compress_level = request.compress_level
+    tar_kwargs = {}
+    if strategy == ArchivalStrategyEnum.ZIP:
+        tar_mode = None
+    elif strategy == ArchivalStrategyEnum.TAR_GZ:
+        tar_mode = 'w:gz'
+        if compress_level is not None:
+            tar_kwargs['compresslevel'] = compress_level
+    elif strategy == ArchivalStrategyEnum.XZ:
+        tar_mode = 'w:xz'
+        if compress_level is not None:
+            tar_kwargs['preset'] = compress_level
+    else:
+        raise NotImplementedError(f"The compression strategy is not implemented: {strategy.name}")
+    if tar_mode or compress_level is not None:
+        for create_page_request in create_page_requests:
+            create_page_request.compress_level = 0
 
-        response.save_path = save_path
-        if strategy == ArchivalStrategyEnum.ZIP:
-            with zipfile.ZipFile(save_path, mode='w', compression=zipfile.ZIP_DEFLATED) as zipobj:
-                for path in tmp_save_dir.iterdir():
-                    filename = path.name
-                    zipobj.write(path, filename)
-            response.status = WriteArchiveResponseStatus.SUCCESS
-            return response
-        elif strategy == ArchivalStrategyEnum.TAR_GZ:
-            with tarfile.open(save_path, mode='w:gz') as tarobj:
-                for path in tmp_save_dir.iterdir():
-                    tarobj.add(path, arcname=path.name)
-            response.status = WriteArchiveResponseStatus.SUCCESS
-            return response
-        elif strategy == ArchivalStrategyEnum.XZ:
-            with tarfile.open(save_path, mode='w:xz') as tarobj:
-                for path in tmp_save_dir.iterdir():
-                    tarobj.add(path, arcname=path.name)
-            response.status = WriteArchiveResponseStatus.SUCCESS
-            return response
+    try:
+        pages = __iter_page_bytes(create_page_requests, num_workers)
+        if tar_mode:
+            mtime = time.time()
+            with tarfile.open(save_path, mode=tar_mode, **tar_kwargs) as tarobj:
+                for filename, data in pages:
+                    tarinfo = tarfile.TarInfo(filename)
+                    tarinfo.size = len(data)
+                    tarinfo.mtime = mtime
+                    tarobj.addfile(tarinfo, io.BytesIO(data))
         else:
-            raise NotImplementedError(f"The compression strategy is not implemented: {strategy.name}")
+            compression = zipfile.ZIP_STORED if compress_level is None else zipfile.ZIP_DEFLATED
+            with zipfile.ZipFile(save_path, mode='w', compression=compression, compresslevel=compress_level) as zipobj:
+                for filename, data in pages:
+                    zipobj.writestr(filename, data)
+    except Exception as e:
+        logger.error(f"Failed to write pages to archive due to error: {e}")
+        response.status = WriteArchiveResponseStatus.FAILURE
+        response.error = str(e)
+        return response
+    response.status = WriteArchiveResponseStatus.SUCCESS
+    response.save_path = save_path
+    return response
+
+def __iter_page_bytes(create_page_requests: List[CreatePageRequest], num_workers: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield the filename and encoded bytes of each requested page, in order.
+    """
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            filenames = [create_page_request.filename for create_page_request in create_page_requests]
+            yield from zip(filenames, executor.map(get_page_bytes, create_page_requests))
+    else:
+        for create_page_request in create_page_requests:
+            yield create_page_request.filename, get_page_bytes(create_page_request)
 
 def write_archives_to_disk(write_requests: List[WriteArchiveRequest]) -> List[WriteArchiveResponse]:
     """
@@ -87,10 +122,17 @@ def write_archives_to_disk(write_requests: List[WriteArchiveRequest]) -> List[Wr
     pool.close()
     return responses
 
-def create_comic(output: Union[str, Path], comic_id: str, width: int, height: int, num_pages: int, archival_strategy: ArchivalStrategyEnum=ArchivalStrategyEnum.ZIP) -> WriteArchiveResponse:
+def create_comic(
+        output: Union[str, Path], comic_id: str, width: int, height: int, num_pages: int,
+        archival_strategy: ArchivalStrategyEnum=ArchivalStrategyEnum.ZIP, num_workers: int=1,
+        compress_level: int=None
+) -> WriteArchiveResponse:
     """
     Create comic pages in a specified output directory with given metadata,
     and returns the list of paths of the images.
+
+    Pages are rendered by `num_workers` processes; pass `os.cpu_count()` for large comics.
+    See `WriteArchiveRequest` for `compress_level`.
     """
     if isinstance(output, str):
         output = Path(output)
@@ -103,6 +145,6 @@ def create_comic(output: Union[str, Path], comic_id: str, width: int, height: in
         create_request = CreatePageRequest(width, height, filename, text=text)
         create_page_requests.append(create_request)
 
-    request = WriteArchiveRequest(create_page_requests, output, archival_strategy)
-    response = write_archive_to_disk(request)
+    request = WriteArchiveRequest(create_page_requests, output, archival_strategy, compress_level=compress_level)
+    response = write_archive_to_disk(request, num_workers=num_workers)
     return response
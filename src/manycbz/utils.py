@@ -1,4 +1,6 @@
+import functools
 import importlib.resources
 
+@functools.cache
 def get_roberta_regular_font():
     return importlib.resources.files("manycbz.resources.fonts.Roboto") / "Roboto-Regular.ttf"
\ No newline at end of file
@@ -1,32 +1,50 @@
 import asyncio
+import importlib
 import logging
 from pathlib import Path
+from types import ModuleType
+from typing import Optional, Tuple
 import aiohttp
 import aiohttp.client_exceptions
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
 from fastapi.concurrency import asynccontextmanager
 
 from lanraragi.client import LRRClient
 from satellite.server.dependencies.common import get_config
+from satellite.server.responses import ORJSONResponse
 from satellite.server.routers import archives, database, healthcheck, metadata
-try:
-    from satellite.service.nhdd import DEFAULT_EMBEDDING_DIMENSIONS, Img2VecClient, PostgresDatabaseService
-    from satellite.server.routers.nhdd import nhdd_router
-except ImportError:
-    nhdd_router = None
+from satellite.server.services.locks import LockState
 from satellite.service.database import DatabaseService
 from satellite.utils.version import get_version
 
 logger = logging.getLogger("uvicorn.satellite")
 
+def _load_nhdd(app: FastAPI) -> Tuple[Optional[ModuleType], Optional[APIRouter]]:
+    """
+    Import the NHDD service module and router on first use, and cache them on the app state.
+
+    The NHDD stack pulls in numpy, pgvector and psycopg, so it is only imported when NHDD
+    is configured. Returns (None, None) if its dependencies are not installed.
+    """
+    if not hasattr(app.state, "nhdd_router"):
+        try:
+            app.state.nhdd_service = importlib.import_module("satellite.service.nhdd")
+            app.state.nhdd_router = importlib.import_module("satellite.server.routers.nhdd").nhdd_router
+        except ImportError as import_error:
+            logger.error(f"NHDD is configured but its dependencies could not be imported: {import_error}")
+            app.state.nhdd_service = None
+            app.state.nhdd_router = None
+    return app.state.nhdd_service, app.state.nhdd_router
+
 @asynccontextmanager
-async def lifespan(_: FastAPI):
+async def lifespan(app: FastAPI):
     """
     Satellite server setup and teardown lifecycle.
     Because dependencies cannot be brought in on a lifespan function, we will be instantiating
     temporary instances of those objects instead.
     """
     config = get_config()
+    app.state.lock_state = LockState()
 
     db = config.SATELLITE_DB_PATH
     if not db:
@@ -39,26 +57,39 @@ async def lifespan(_: FastAPI):
         await database.register_api_key(api_key)
         logger.info("API key is registered into database.")
 
+    # check the LRR contents directory once, instead of on every request that uses it.
+    app.state.lrr_contents_dir = None
+    if contents_dir := config.LRR_CONTENTS_DIR:
+        if contents_dir.is_dir():
+            app.state.lrr_contents_dir = contents_dir.resolve()
+        else:
+            logger.error(f"LRR contents directory not found or not a directory: {contents_dir}")
+
     # check if LRR is configured.
     if not config.LRR_SSL_VERIFY:
         logger.warning("SSL verification for LANraragi client is disabled.")
     lrr_host = None
     lrr_version = None
+    # one client (and connection pool) is shared by every request; see `get_lanraragi_client`.
+    app.state.lrr_client = None
+    if config.LRR_HOST:
+        # the API key may be empty, e.g. for a LANraragi server without authentication.
+        app.state.lrr_client = client = LRRClient(
+            lrr_host=config.LRR_HOST, lrr_api_key=config.LRR_API_KEY, ssl=config.LRR_SSL_VERIFY
+        )
+    # only probe the server at startup when it is fully configured.
     if config.LRR_HOST and config.LRR_API_KEY:
         retry_count = 0
         while True:
             try:
-                async with LRRClient(
-                    lrr_host=config.LRR_HOST, lrr_api_key=config.LRR_API_KEY, ssl=config.LRR_SSL_VERIFY
-                ) as client:
-                    lrr_host = config.LRR_HOST
-                    server_info = await client.get_server_info()
-                    if server_info.status_code == 200:
-                        lrr_version = server_info.version
-                        break
-                    else:
-                        logger.error(f"Failed to obtain server info from LRR: {server_info.error}")
-                        break
+                lrr_host = config.LRR_HOST
+                server_info = await client.get_server_info()
+                if server_info.status_code == 200:
+                    lrr_version = server_info.version
+                    break
+                else:
+                    logger.error(f"Failed to obtain server info from LRR: {server_info.error}")
+                    break
             except (
                 aiohttp.client_exceptions.ClientConnectorCertificateError,
                 aiohttp.client_exceptions.ClientConnectorSSLError
@@ -74,6 +105,8 @@ async def lifespan(_: FastAPI):
                 else:
                     logger.error("Failed to obtain server info from LRR due to connection issues.")
                     break
+    elif config.LRR_HOST:
+        logger.info("No LANraragi API key configured; skipping the startup check for the LRR server.")
     else:
         logger.info("""
                     No LANraragi server detected! Satellite will continue to perform tasks that do not require the server.
@@ -84,10 +117,15 @@ async def lifespan(_: FastAPI):
 
                     Satellite Version:  {get_version()}
                     Server Database:    {db} (SQLite)"""
-    if nhdd_router and config.get_is_nhdd_configured():
+    # like the LRR client, one img2vec client and one database connection pool are shared by every nhdd request and job.
+    app.state.img2vec_client = None
+    app.state.nhdd_db = None
+    if config.get_is_nhdd_configured() and (nhdd := _load_nhdd(app)[0]):
+        app.state.img2vec_client = img2vec = nhdd.Img2VecClient(config.IMG2VEC_HOST)
+        app.state.nhdd_db = nhdd_db = nhdd.PostgresDatabaseService(
+            config.NHDD_DB, config.NHDD_DB_USER, config.NHDD_DB_HOST, config.NHDD_DB_PASS, nhdd.DEFAULT_EMBEDDING_DIMENSIONS
+        )
         try:
-            nhdd_db = PostgresDatabaseService(config.NHDD_DB, config.NHDD_DB_USER, config.NHDD_DB_HOST, config.NHDD_DB_PASS, DEFAULT_EMBEDDING_DIMENSIONS)
-            img2vec = Img2VecClient(config.IMG2VEC_HOST)
             try:
                 if not (await img2vec.get_healthcheck()):
                     logger.error("Failed to connect to img2vec service! Img2vec service will not be available.")
@@ -98,9 +136,6 @@ async def lifespan(_: FastAPI):
                     NHDD Database:      {config.NHDD_DB_HOST} (PostgreSQL)"""
         except Exception as exception:
             logger.error(f"Unhandled exception occurred during nhdd setup: {exception}")
-        finally:
-            await nhdd_db.close()
-            await img2vec.close()
     if commit_hash := config.SATELLITE_GIT_COMMIT_HASH:
         message += f"""
                     Commit Hash:        {commit_hash}"""
@@ -112,11 +147,20 @@ async def lifespan(_: FastAPI):
 
     message += "\n"
     logger.info(message)
-    yield
+    try:
+        yield
+    finally:
+        if app.state.lrr_client is not None:
+            await app.state.lrr_client.close()
+        if app.state.img2vec_client is not None:
+            await app.state.img2vec_client.close()
+        if app.state.nhdd_db is not None:
+            await app.state.nhdd_db.close()
 
 app = FastAPI(
     title="Satellite Server",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url=None,
     openapi_url=None,
     redoc_url=None,
@@ -126,6 +170,6 @@ app.include_router(archives.router)
 app.include_router(healthcheck.router)
 app.include_router(metadata.router)
 app.include_router(database.router)
-if nhdd_router and get_config().get_is_nhdd_configured():
+if get_config().get_is_nhdd_configured() and (nhdd_router := _load_nhdd(app)[1]):
     logger.info("NHDD service is enabled.")
     app.include_router(nhdd_router)
\ No newline at end of file
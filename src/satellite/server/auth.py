@@ -1,22 +1,37 @@
-import re
+import hashlib
+import time
+from typing import Dict
 from fastapi import HTTPException, Security
 from fastapi.security import APIKeyHeader
 
 from satellite.server.dependencies.common import ConfigT
-from satellite.service.database import DatabaseService
+from satellite.server.dependencies.database import DatabaseServiceT
 
 
 api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
+_BEARER_PREFIX = "Bearer "
+
+# digests of recently verified API keys -> expiry time, so repeated requests skip the database and bcrypt.
+# keys are stored as digests so raw keys are not kept in memory.
+_VERIFIED_API_KEY_TTL = 30
+_VERIFIED_API_KEYS_MAX_SIZE = 1024
+_verified_api_keys: Dict[bytes, float] = {}
+
+def clear_verified_api_keys():
+    """
+    Forget all cached API key verifications; must be called whenever the auth table changes.
+    """
+    _verified_api_keys.clear()
 
 def extract_api_key(api_key_header: str):
     """
     Gets API key from header.
     """
-    pattern = re.compile('Bearer (.*)')
-    result = pattern.findall(api_key_header)
-    return result[0] if result else ""
+    if api_key_header and api_key_header.startswith(_BEARER_PREFIX):
+        return api_key_header[len(_BEARER_PREFIX):]
+    return ""
 
-async def is_valid_api_key_header(config: ConfigT, api_key_header: str = Security(api_key_header)):
+async def is_valid_api_key_header(config: ConfigT, database: DatabaseServiceT, api_key_header: str = Security(api_key_header)):
     """
     Check if the API key header is valid.
 
@@ -24,9 +39,15 @@ async def is_valid_api_key_header(config: ConfigT, api_key_header: str = Securit
     """
     if config.SATELLITE_DISABLE_API_KEY:
         return True
-    database = DatabaseService(config.SATELLITE_DB_PATH)
     api_key = extract_api_key(api_key_header)
     api_key_b = api_key.encode(encoding='utf-8')
+    digest = hashlib.blake2b(api_key_b, digest_size=16).digest()
+    now = time.monotonic()
+    if _verified_api_keys.get(digest, 0) > now:
+        return True
     if await database.verify_api_key(api_key_b):
+        if len(_verified_api_keys) >= _VERIFIED_API_KEYS_MAX_SIZE:
+            _verified_api_keys.clear()
+        _verified_api_keys[digest] = now + _VERIFIED_API_KEY_TTL
         return True
     raise HTTPException(status_code=401, detail="Invalid API key.")
@@ -50,6 +50,8 @@ class SatelliteConfig:
 
         # this should be proportional to the amount of img2vec services running in the backend.
         self.IMG2VEC_WORKERS = int(os.getenv("IMG2VEC_WORKERS", 1))
+        # images sent per embeddings-batch request; larger batches keep a GPU-backed img2vec busier.
+        self.IMG2VEC_BATCH_SIZE = int(os.getenv("IMG2VEC_BATCH_SIZE", 4))
 
     def get_is_nhdd_configured(self) -> bool:
         return all(x is not None for x in [self.NHDD_DB, self.NHDD_DB_HOST, self.NHDD_DB_USER, self.NHDD_DB_PASS, self.IMG2VEC_HOST])
@@ -1,22 +1,39 @@
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Request
+import functools
 import logging
-from typing import Annotated, TypeAlias
+from pathlib import Path
+from typing import Annotated, TypeAlias, Union
 
 from lanraragi.client import LRRClient
 from satellite.server.config import SatelliteConfig
 
+# dependencies that do no blocking work are `async def`, so FastAPI calls them on the event loop
+# instead of handing each one to the threadpool on every request.
+
 LOGGER = logging.getLogger("uvicorn.satellite")
-def get_logger():
+async def get_logger():
     return LOGGER
 LoggerT: TypeAlias = Annotated[logging.Logger, Depends(get_logger)]
 
+@functools.lru_cache(maxsize=1)
 def get_config():
+    # the environment is read once per process; call `get_config.cache_clear()` to reload it.
     config = SatelliteConfig()
     return config
-ConfigT: TypeAlias = Annotated[SatelliteConfig, Depends(get_config)]
+async def get_config_dependency():
+    return get_config()
+ConfigT: TypeAlias = Annotated[SatelliteConfig, Depends(get_config_dependency)]
+
+async def get_lanraragi_client(request: Request):
+    # the client is created once in the app lifespan and must not be closed by its users.
+    client: LRRClient = request.app.state.lrr_client
+    if client is None:
+        raise HTTPException(status_code=503, detail="LANraragi is not configured")
+    return client
+LRRClientT: TypeAlias = Annotated[LRRClient, Depends(get_lanraragi_client)]
 
-async def get_lanraragi_client(config: ConfigT):
-    client = LRRClient(lrr_host=config.LRR_HOST, lrr_api_key=config.LRR_API_KEY, ssl=config.LRR_SSL_VERIFY)
-    yield client
-    await client.close()
-LRRClientT: TypeAlias = Annotated[LRRClient, Depends(get_lanraragi_client)]
\ No newline at end of file
+async def get_lrr_contents_dir(request: Request):
+    # validated once in the app lifespan; None if the directory is not configured or does not exist.
+    contents_dir: Union[Path, None] = request.app.state.lrr_contents_dir
+    return contents_dir
+LRRContentsDirT: TypeAlias = Annotated[Union[Path, None], Depends(get_lrr_contents_dir)]
\ No newline at end of file
@@ -1,8 +1,14 @@
 from fastapi import Depends
+import functools
 from typing import Annotated, TypeAlias
 from satellite.server.dependencies.common import ConfigT
 from satellite.service.database import DatabaseService
 
-def get_server_db_service(config: ConfigT):
-    return DatabaseService(config.SATELLITE_DB_PATH)
+@functools.lru_cache(maxsize=1)
+def __create_server_db_service(db_path) -> DatabaseService:
+    # the service only holds the database path, so one instance is shared by all requests.
+    return DatabaseService(db_path)
+
+async def get_server_db_service(config: ConfigT):
+    return __create_server_db_service(config.SATELLITE_DB_PATH)
 DatabaseServiceT: TypeAlias = Annotated[DatabaseService, Depends(get_server_db_service)]
\ No newline at end of file
@@ -1,11 +1,10 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from typing import Annotated, TypeAlias
 
-from satellite.server.dependencies.common import ConfigT
-from satellite.service.nhdd import DEFAULT_EMBEDDING_DIMENSIONS, PostgresDatabaseService
+from satellite.service.nhdd import PostgresDatabaseService
 
-async def get_postgres_service(config: ConfigT):
-    database = PostgresDatabaseService(config.NHDD_DB, config.NHDD_DB_USER, config.NHDD_DB_HOST, config.NHDD_DB_PASS, DEFAULT_EMBEDDING_DIMENSIONS)
-    yield database
-    await database.close()
-NhddDatabaseServiceT: TypeAlias = Annotated[PostgresDatabaseService, Depends(get_postgres_service)]
\ No newline at end of file
+async def get_postgres_service(request: Request):
+    # the service and its connection pool are created once in the app lifespan and must not be closed by its users.
+    database: PostgresDatabaseService = request.app.state.nhdd_db
+    return database
+NhddDatabaseServiceT: TypeAlias = Annotated[PostgresDatabaseService, Depends(get_postgres_service)]
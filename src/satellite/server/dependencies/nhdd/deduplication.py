@@ -1,14 +1,14 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from typing import Annotated, TypeAlias
 
 from satellite.server.dependencies.common import ConfigT, LRRClientT, LoggerT
 from satellite.server.dependencies.nhdd.database import NhddDatabaseServiceT
 from satellite.service.nhdd import DeduplicationService, Img2VecClient
 
-async def get_img2vec_service(config: ConfigT, logger: LoggerT):
-    img2vec = Img2VecClient(config.IMG2VEC_HOST)
-    yield img2vec
-    await img2vec.close()
+async def get_img2vec_service(request: Request):
+    # the client is created once in the app lifespan and must not be closed by its users.
+    img2vec: Img2VecClient = request.app.state.img2vec_client
+    return img2vec
 Img2VecServiceT: TypeAlias = Annotated[Img2VecClient, Depends(get_img2vec_service)]
 
 async def get_deduplication_service(lrr: LRRClientT, db: NhddDatabaseServiceT, img2vec: Img2VecServiceT, config: ConfigT, logger: LoggerT):
@@ -16,7 +16,8 @@ async def get_deduplication_service(lrr: LRRClientT, db: NhddDatabaseServiceT, i
         lrr, db, img2vec, config.IMG2VEC_WORKERS, 
         nhentai_archivist_dndm=config.NHENTAI_ARCHIVIST_DONOTDOWNLOADME_PATH,
         lrr_contents_dir=config.LRR_CONTENTS_DIR,
-        logger=logger
+        logger=logger,
+        img2vec_batch_size=config.IMG2VEC_BATCH_SIZE
     )
     yield dd_service
     await dd_service.close()
@@ -0,0 +1,18 @@
+"""
+Response classes for the satellite server.
+"""
+
+from typing import Any
+from fastapi.responses import JSONResponse
+import orjson
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson instead of the standard library `json` module.
+
+    FastAPI ships its own `ORJSONResponse`, but deprecates it in favor of response models;
+    the routers here return plain dicts, so they use this class instead.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
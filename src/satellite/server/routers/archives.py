@@ -8,12 +8,12 @@ To use this API, the server must at least have RW access to the contents directo
 """
 
 from fastapi import APIRouter, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
 
 from satellite.server.auth import is_valid_api_key_header
-from satellite.server.dependencies.common import ConfigT, LoggerT
+from satellite.server.dependencies.common import LRRContentsDirT, LoggerT
 from satellite.server.dependencies.database import DatabaseServiceT
-from satellite.server.services.locks import LockStateT
+from satellite.server.responses import ORJSONResponse
+from satellite.server.services.locks import LockStateT, queue_background_task
 from satellite.server.services.archives import delete_corrupted_archives, scan_lrr_archives
 
 router = APIRouter(
@@ -23,7 +23,7 @@ router = APIRouter(
 
 @router.post("/scan")
 async def queue_scan_lrr_archives(
-    background_tasks: BackgroundTasks, database: DatabaseServiceT, lock_state: LockStateT, config: ConfigT, logger: LoggerT,
+    background_tasks: BackgroundTasks, database: DatabaseServiceT, lock_state: LockStateT, contents_dir: LRRContentsDirT, logger: LoggerT,
     num_workers: int=0, batch_size: int=1000
 ):
     """
@@ -46,27 +46,21 @@ async def queue_scan_lrr_archives(
         logger.info(f"[lrr_scan_archives] Received request: using all cpus, batch = {batch_size}")
     else:
         logger.info(f"[lrr_scan_archives] Received request: cpus = {num_workers}, batch = {batch_size}")
-    contents_dir = config.LRR_CONTENTS_DIR
     if not contents_dir:
-        return JSONResponse({"message": "LRR contents not configured!"}, status_code=404)
-    if not contents_dir.exists():
-        return JSONResponse({
-            "message": f"LRR contents not found! {contents_dir}"
-        }, status_code=404)
-    if not contents_dir.is_dir():
-        return JSONResponse({
-            "message": f"LRR contents is not a directory: {contents_dir}"
-        }, status_code=500)
+        return ORJSONResponse({"message": "LRR contents not configured or not found!"}, status_code=404)
     try:
         num_workers = int(num_workers)
         if num_workers < 0:
             raise ValueError
     except ValueError:
-        return JSONResponse({
+        return ORJSONResponse({
             "message": f"Invalid number of workers: {num_workers} must be non-negative integer."
         }, status_code=400)
-    background_tasks.add_task(scan_lrr_archives, contents_dir, database, num_workers, batch_size, lock_state.RWLOCK)
-    return JSONResponse({"message": f"Queued file scan of {contents_dir}."})
+    if not await queue_background_task(background_tasks, lock_state, scan_lrr_archives, contents_dir, database, num_workers, batch_size, lock_state.RWLOCK):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({"message": f"Queued file scan of {contents_dir}."})
 
 @router.get("")
 async def get_lrr_archives(status: int, database: DatabaseServiceT, logger: LoggerT, limit: int=100_000):
@@ -82,7 +76,7 @@ async def get_lrr_archives(status: int, database: DatabaseServiceT, logger: Logg
     | 4 | ERROR |
     """
     results = await database.get_archive_scans_by_status(status)
-    return JSONResponse(results)
+    return ORJSONResponse(results)
 
 @router.delete("/corrupted")
 async def queue_delete_corrupted_archives(
@@ -91,5 +85,8 @@ async def queue_delete_corrupted_archives(
     """
     Run background job to delete all corrupted archives.
     """
-    background_tasks.add_task(delete_corrupted_archives, database, lock_state.RWLOCK)
-    return JSONResponse({"message": "Queued deletion of corrupted archives."})
+    if not await queue_background_task(background_tasks, lock_state, delete_corrupted_archives, database, lock_state.RWLOCK):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({"message": "Queued deletion of corrupted archives."})
@@ -5,10 +5,10 @@ Offers ways to reset the server's various tables.
 """
 
 from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
 
-from satellite.server.auth import is_valid_api_key_header
+from satellite.server.auth import clear_verified_api_keys, is_valid_api_key_header
 from satellite.server.dependencies.database import DatabaseServiceT
+from satellite.server.responses import ORJSONResponse
 
 router = APIRouter(
     prefix="/api/database",
@@ -19,7 +19,8 @@ router = APIRouter(
 async def reset_auth_table(database: DatabaseServiceT):
     await database.drop_auth_table()
     await database.create_auth_table()
-    return JSONResponse({
+    clear_verified_api_keys()
+    return ORJSONResponse({
         "message": "auth reset."
     })
 
@@ -27,7 +28,7 @@ async def reset_auth_table(database: DatabaseServiceT):
 async def reset_archive_scan_table(database: DatabaseServiceT):
     await database.drop_archive_scan_table()
     await database.create_archive_scan_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "archive_scan reset."
     })
 
@@ -35,7 +36,7 @@ async def reset_archive_scan_table(database: DatabaseServiceT):
 async def reset_archive_upload_table(database: DatabaseServiceT):
     await database.drop_archive_upload_table()
     await database.create_archive_upload_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "archive_upload reset."
     })
 
@@ -43,6 +44,6 @@ async def reset_archive_upload_table(database: DatabaseServiceT):
 async def reset_metadata_plugin_task(database: DatabaseServiceT):
     await database.drop_metadata_plugin_task_table()
     await database.create_metadata_plugin_task_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "metadata_plugin_task reset."
     })
@@ -5,9 +5,9 @@ Healthcheck API
 import logging
 from aiohttp import ClientConnectionError
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
 
 from satellite.server.dependencies.common import ConfigT, LRRClientT
+from satellite.server.responses import ORJSONResponse
 
 
 # disable healthcheck logging to reduce noise.
@@ -35,18 +35,16 @@ async def lanraragi_healthcheck(config: ConfigT, client: LRRClientT):
     try:
         response = await client.get_shinobu_status()
         if response.status_code == 200:
-            return JSONResponse({"message": f"LANraragi is configured properly! Targeting host: {config.LRR_HOST}"})
+            return ORJSONResponse({"message": f"LANraragi is configured properly! Targeting host: {config.LRR_HOST}"})
         else:
-            return JSONResponse({
+            return ORJSONResponse({
                 "message": "Invalid LRR configuration: " + response.error
             }, status_code=500)
     except ClientConnectionError as connection_error:
-        return JSONResponse({
+        return ORJSONResponse({
             "message": "Connection error: " + str(connection_error)
         }, status_code=500)
     except KeyError as key_error:
-        return JSONResponse({
+        return ORJSONResponse({
             "message": "Invalid LRR configuration: " + str(key_error)
-        }, status_code=500)
-    finally:
-        await client.close()
\ No newline at end of file
+        }, status_code=500)
\ No newline at end of file
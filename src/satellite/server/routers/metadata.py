@@ -5,13 +5,13 @@ Various API for batch offline downloader metadata and metadata plugin invokation
 """
 
 from fastapi import APIRouter, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
 
 from satellite.server.auth import is_valid_api_key_header
 from satellite.server.dependencies.common import LRRClientT, LoggerT
 from satellite.server.dependencies.database import DatabaseServiceT
 from satellite.server.dependencies.metadata import NhentaiArchivistMetadataServiceT, PixivUtilMetadataServiceT
-from satellite.server.services.locks import LockStateT
+from satellite.server.responses import ORJSONResponse
+from satellite.server.services.locks import LockStateT, queue_background_task
 from satellite.server.services.metadata import update_metadata, update_metadata_from_plugin
 
 router = APIRouter(
@@ -24,16 +24,30 @@ async def queue_update_data_from_nhentai_archivist(
     background_tasks: BackgroundTasks, metadata_service: NhentaiArchivistMetadataServiceT, lanraragi: LRRClientT,
     lock_state: LockStateT
 ):
-    background_tasks.add_task(update_metadata, lanraragi, metadata_service, lock_state.RWLOCK)
-    return JSONResponse({"message": "Queued metadata updates for nhentai archivist."})
+    if lock_state.is_rwlock_locked():
+        return ORJSONResponse({
+            "message": "A metadata job is already running."
+        }, status_code=423)
+    if not await queue_background_task(background_tasks, lock_state, update_metadata, lanraragi, metadata_service, lock_state.RWLOCK):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({"message": "Queued metadata updates for nhentai archivist."})
 
 @router.post("/pixivutil2")
 async def queue_update_data_from_pixivutil2(
     background_tasks: BackgroundTasks, metadata_service: PixivUtilMetadataServiceT, lanraragi: LRRClientT, 
     lock_state: LockStateT
 ):
-    background_tasks.add_task(update_metadata, lanraragi, metadata_service, lock_state.RWLOCK)
-    return JSONResponse({"message": "Queued metadata updates for PixivUtil2."})
+    if lock_state.is_rwlock_locked():
+        return ORJSONResponse({
+            "message": "A metadata job is already running."
+        }, status_code=423)
+    if not await queue_background_task(background_tasks, lock_state, update_metadata, lanraragi, metadata_service, lock_state.RWLOCK):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({"message": "Queued metadata updates for PixivUtil2."})
 
 @router.post("/plugins/{plugin_namespace}")
 async def queue_update_archive_metadata_with_plugin(
@@ -80,12 +94,19 @@ async def queue_update_archive_metadata_with_plugin(
     """
     logger.info(f"[metadata_plugin] plugin namespace = {plugin_namespace}, max sleep time = {sleep_time}")
     if not plugin_namespace or plugin_namespace not in {"pixivmetadata", "nhplugin"}:
-        return JSONResponse({
+        return ORJSONResponse({
             "message": f"Misconfigured plugin namespace: {plugin_namespace}"
         }, status_code=400)
-    background_tasks.add_task(
-        update_metadata_from_plugin, lanraragi, database, plugin_namespace, lock_state.RWLOCK, sleep_time, retry_ok=retry_ok
-    )
-    return JSONResponse({
+    if lock_state.is_rwlock_locked():
+        return ORJSONResponse({
+            "message": "A metadata job is already running."
+        }, status_code=423)
+    if not await queue_background_task(
+        background_tasks, lock_state, update_metadata_from_plugin, lanraragi, database, plugin_namespace, lock_state.RWLOCK, sleep_time, retry_ok=retry_ok
+    ):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({
         "message": f"Queued invokation of the {plugin_namespace} metadata plugin."
     })
@@ -1,12 +1,15 @@
-import asyncio
 from fastapi import APIRouter, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+import orjson
 
 from satellite.server.auth import is_valid_api_key_header
 from satellite.server.dependencies.nhdd.database import NhddDatabaseServiceT
 from satellite.server.dependencies.nhdd.deduplication import DeduplicationServiceT
-from satellite.server.services.locks import LockStateT
-from satellite.server.services.nhdd import compute_subarchives, create_page_embeddings, remove_duplicates, update_nhentai_archives_data
+from satellite.server.responses import ORJSONResponse
+from satellite.server.services.locks import LockStateT, queue_background_task
+from satellite.server.services.nhdd import (
+    clear_subarchive_info_cache, compute_subarchives, create_page_embeddings, get_subarchive_info, remove_duplicates, update_nhentai_archives_data
+)
 from satellite.service.nhdd import ArchiveEmbeddingJobStatus, MetadataPluginStatus
 
 nhdd_router = APIRouter(
@@ -18,23 +21,39 @@ nhdd_router = APIRouter(
 async def get_duplicate_archives(dd_service: DeduplicationServiceT):
     """
     Get all archives which are duplicates (lesser-duplicate or equal-duplicate).
+
+    The response is streamed as archive IDs are read from the database, so memory stays
+    bounded regardless of the number of duplicates.
     """
-    duplicates = await dd_service.get_duplicate_archives()
-    return JSONResponse({
-        "message": "success",
-        "duplicates": duplicates
-    })
+    async def __stream_duplicates():
+        yield b'{"message":"success","duplicates":['
+        separator = b''
+        chunk = []
+        async for archive_id in dd_service.iter_duplicate_archives():
+            chunk.append(orjson.dumps(archive_id))
+            if len(chunk) == 1024:
+                yield separator + b','.join(chunk)
+                separator = b','
+                chunk = []
+        if chunk:
+            yield separator + b','.join(chunk)
+        yield b']}'
+    return StreamingResponse(__stream_duplicates(), media_type="application/json")
 
 @nhdd_router.get("/duplicates/{archive_id}")
 async def get_is_duplicate(archive_id: str, dd_service: DeduplicationServiceT):
     """
-    TODO: Get subarchive info on archive by ID. Returns whether it is a duplicate, and
+    Get subarchive info on archive by ID. Returns whether it is a duplicate, and
     what archive it is a duplicate of.
+
+    Lookups are cached for up to a minute; the cache is cleared whenever the subarchive
+    map is recomputed or deleted through this API.
     """
-    return JSONResponse({
+    is_duplicate, is_duplicate_of = await get_subarchive_info(archive_id, dd_service)
+    return ORJSONResponse({
         "message": "Success",
-        "is_duplicate": True,
-        "is_duplicate_of": "xxx"
+        "is_duplicate": is_duplicate,
+        "is_duplicate_of": is_duplicate_of
     })
 
 @nhdd_router.delete("/duplicates")
@@ -46,7 +65,7 @@ async def delete_duplicate_archives(dd_service: DeduplicationServiceT, backgroun
     Other option: make API call to delete archives from the LRR server.
     """
     results = await remove_duplicates(is_dry_run, lock_state.contents_lock, dd_service)
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "OK",
         "deleted": results.deleted_duplicates,
         "deleted-size": results.duplicate_size,
@@ -56,21 +75,13 @@ async def delete_duplicate_archives(dd_service: DeduplicationServiceT, backgroun
 
 @nhdd_router.get("/page-embeddings/status")
 async def get_create_page_embeddings_status(db: NhddDatabaseServiceT):
-    num_success, num_failed, num_pending, num_notfound, num_skipped = await asyncio.gather(*[
-        asyncio.create_task(db.get_num_archive_embedding_jobs_by_status(status)) for status in [
-            ArchiveEmbeddingJobStatus.SUCCESS, 
-            ArchiveEmbeddingJobStatus.FAILED,
-            ArchiveEmbeddingJobStatus.PENDING, 
-            ArchiveEmbeddingJobStatus.NOT_FOUND, 
-            ArchiveEmbeddingJobStatus.SKIPPED
-        ]
-    ])
-    return JSONResponse({
-        "success": num_success,
-        "failed": num_failed,
-        "pending": num_pending,
-        "not_found": num_notfound,
-        "skipped": num_skipped
+    counts = await db.get_archive_embedding_job_status_counts()
+    return ORJSONResponse({
+        "success": counts.get(ArchiveEmbeddingJobStatus.SUCCESS, 0),
+        "failed": counts.get(ArchiveEmbeddingJobStatus.FAILED, 0),
+        "pending": counts.get(ArchiveEmbeddingJobStatus.PENDING, 0),
+        "not_found": counts.get(ArchiveEmbeddingJobStatus.NOT_FOUND, 0),
+        "skipped": counts.get(ArchiveEmbeddingJobStatus.SKIPPED, 0)
     })
 
 @nhdd_router.post("/page-embeddings")
@@ -81,26 +92,25 @@ async def queue_create_page_embeddings(background_tasks: BackgroundTasks, dd_ser
     """
     lock = lock_state.create_page_embeddings_lock
     if lock.locked():
-        return JSONResponse({
+        return ORJSONResponse({
             "message": "A create page embedding job is already queued."
         }, status_code=423)
-    background_tasks.add_task(create_page_embeddings, lock, dd_service)
-    return JSONResponse({
+    if not await queue_background_task(background_tasks, lock_state, create_page_embeddings, lock, dd_service):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({
         "message": "Queued create page embeddings."
     })
 
 @nhdd_router.get("/nhentai-archives/favorites/status")
 async def get_nhentai_archives_favorites_job_task_status(db: NhddDatabaseServiceT):
-    num_success, num_failed, num_pending, num_notfound = await asyncio.gather(*[
-        asyncio.create_task(db.get_num_archive_metadata_jobs_by_status(status)) for status in [
-            MetadataPluginStatus.SUCCESS, MetadataPluginStatus.FAILED, MetadataPluginStatus.PENDING, MetadataPluginStatus.NOT_FOUND
-        ]
-    ])
-    return JSONResponse({
-        "success": num_success,
-        "failed": num_failed,
-        "pending": num_pending,
-        "not_found": num_notfound
+    counts = await db.get_archive_metadata_job_status_counts()
+    return ORJSONResponse({
+        "success": counts.get(MetadataPluginStatus.SUCCESS, 0),
+        "failed": counts.get(MetadataPluginStatus.FAILED, 0),
+        "pending": counts.get(MetadataPluginStatus.PENDING, 0),
+        "not_found": counts.get(MetadataPluginStatus.NOT_FOUND, 0)
     })
 
 @nhdd_router.post("/nhentai-archives")
@@ -126,63 +136,81 @@ async def queue_nhentai_archives_update(
     """
     lock = lock_state.nhentai_archives_data_lock
     if lock.locked():
-        return JSONResponse({
+        return ORJSONResponse({
             "message": "A nhentai table update job is already queued."
         }, status_code=423)
-    background_tasks.add_task(update_nhentai_archives_data, lock, discover_archives, fetch_favorites, dd_service, redo_failed)
-    return JSONResponse({
+    if not await queue_background_task(background_tasks, lock_state, update_nhentai_archives_data, lock, discover_archives, fetch_favorites, dd_service, redo_failed):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({
         "message": "Queued nhentai table updates."
     })
 
 @nhdd_router.post("/subarchives")
 async def queue_compute_subarchives(
-    background_tasks: BackgroundTasks, dd_service: DeduplicationServiceT, lock_state: LockStateT
+    background_tasks: BackgroundTasks, dd_service: DeduplicationServiceT, lock_state: LockStateT,
+    min_similarity: float=0.95
 ):
     """
     Queue a job to discover duplicates from all nhentai archives discovered in the
     database.
+
+    parameters
+    ----------
+    min_similarity : 0.95
+        Cosine similarity above which two pages are considered the same, when finding
+        candidate archives and when verifying them page by page.
     """
+    if not 0 < min_similarity <= 1:
+        return ORJSONResponse({
+            "message": f"Invalid min_similarity: {min_similarity} must be in (0, 1]."
+        }, status_code=400)
     lock = lock_state.compute_subarchives_lock
     if lock.locked():
-        return JSONResponse({
+        return ORJSONResponse({
             "message": "A subarchive computation job is already queued."
         }, status_code=423)
-    background_tasks.add_task(compute_subarchives, lock, dd_service)
-    return JSONResponse({
+    if not await queue_background_task(background_tasks, lock_state, compute_subarchives, lock, dd_service, min_similarity=min_similarity):
+        return ORJSONResponse({
+            "message": "All background task slots are busy; try again later."
+        }, status_code=503)
+    return ORJSONResponse({
         "message": "Queued subarchive computation."
     })
 
 @nhdd_router.delete("/db/archive_embedding_job")
 async def delete_archive_embedding_job_table(db: NhddDatabaseServiceT):
     await db.clear_archive_embedding_job_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "Table deleted: archive_embedding_job"
     })
 
 @nhdd_router.delete("/db/page")
 async def delete_page_table(db: NhddDatabaseServiceT):
     await db.clear_page_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "Table deleted: page"
     })
 
 @nhdd_router.delete("/db/subarchive_map")
 async def delete_subarchive_map_table(db: NhddDatabaseServiceT):
     await db.clear_subarchive_map_table()
-    return JSONResponse({
+    clear_subarchive_info_cache()
+    return ORJSONResponse({
         "message": "Table deleted: subarchive_map"
     })
 
 @nhdd_router.delete("/db/archive_metadata_job")
 async def delete_archive_metadata_job_table(db: NhddDatabaseServiceT):
     await db.clear_archive_metadata_job_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "Table deleted: archive_metadata_job"
     })
 
 @nhdd_router.delete("/db/nhentai_archive")
 async def delete_nhentai_archive_table(db: NhddDatabaseServiceT):
     await db.clear_nhentai_archive_table()
-    return JSONResponse({
+    return ORJSONResponse({
         "message": "Table deleted: nhentai_archive"
     })
\ No newline at end of file
@@ -10,7 +10,7 @@ import logging
 import multiprocessing
 from pathlib import Path
 import time
-from typing import Tuple
+from typing import List, Tuple
 
 from aiorwlock import RWLock
 
@@ -37,6 +37,16 @@ def __analyze_archive(path_str: str) -> ArchiveAnalysisResponse:
     except Exception:
         return ArchiveAnalysisResponse.ERROR
 
+def __discover_archives(contents_dir: Path) -> List[Tuple[str, float, str]]:
+    """
+    Blocking archive discovery; returns the (path, mtime, md5 of path) of each archive in the contents directory.
+    """
+    archives = []
+    for archive in discover_all_archives_in_folder(contents_dir):
+        path = str(archive.absolute())
+        archives.append((path, archive.stat().st_mtime, hashlib.md5(path.encode('utf-8')).hexdigest()))
+    return archives
+
 async def scan_lrr_archives(contents_dir: Path, database: DatabaseService, num_workers: int, batch_size: int, lock: RWLock):
 
     async def __handle_response(md5: str, path_name: str, response: ArchiveAnalysisResponse, mtime: float, row_id: int, num_rows: int):
@@ -66,7 +76,7 @@ async def scan_lrr_archives(contents_dir: Path, database: DatabaseService, num_w
         md5 = DatabaseService.get_archive_scan_md5(row)
         mtime = DatabaseService.get_archive_scan_mtime(row)
         async with semaphore:
-            response = __analyze_archive(_path)
+            response = await asyncio.to_thread(__analyze_archive, str(_path))
             await __handle_response(md5, _path.name, response, mtime, row_id, num_rows)
 
     # check and adjust number of workers.
@@ -90,12 +100,10 @@ async def scan_lrr_archives(contents_dir: Path, database: DatabaseService, num_w
         start_time = time.time()
 
         # phase 1: scan all archives
-        all_archives = discover_all_archives_in_folder(contents_dir)
+        # walking the contents directory is blocking filesystem work; keep it off the event loop.
+        all_archives = await asyncio.to_thread(__discover_archives, contents_dir)
         archive_paths = []
-        for archive in all_archives:
-            path = str(archive.absolute())
-            mtime = archive.stat().st_mtime
-            md5 = hashlib.md5(path.encode('utf-8')).hexdigest()
+        for path, mtime, md5 in all_archives:
             row = await database.get_archive_scan_by_md5(md5)
             if row and DatabaseService.get_archive_scan_mtime(row) == mtime: # archive is scanned and has result.
                 continue
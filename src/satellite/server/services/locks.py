@@ -1,22 +1,67 @@
 import asyncio
-from typing import Annotated, TypeAlias
+from typing import Annotated, Awaitable, Callable, TypeAlias, TypeVar
 from aiorwlock import RWLock
-from fastapi import Depends
+from fastapi import BackgroundTasks, Depends, Request
 
+# at most this many background jobs run at once; further jobs are refused until a slot frees up.
+BACKGROUND_TASK_LIMIT = 4
+
+T = TypeVar("T")
 
 class LockState:
     """
     Allow concurrent reader, only one writer.
+
+    Locks are created per instance; the server creates its instance in the app lifespan,
+    so they are bound to the serving event loop.
     """
-    RWLOCK = RWLock()
+    RWLOCK: RWLock
 
     # nhdd locks.
-    nhentai_archives_data_lock = asyncio.Lock()
-    create_page_embeddings_lock = asyncio.Lock()
-    compute_subarchives_lock = asyncio.Lock()
-    contents_lock = asyncio.Lock()
-
-lock_state = LockState()
-def get_lock_state():
-    return lock_state
+    nhentai_archives_data_lock: asyncio.Lock
+    create_page_embeddings_lock: asyncio.Lock
+    compute_subarchives_lock: asyncio.Lock
+    contents_lock: asyncio.Lock
+
+    background_task_semaphore: asyncio.Semaphore
+
+    def __init__(self):
+        self.RWLOCK = RWLock()
+        self.nhentai_archives_data_lock = asyncio.Lock()
+        self.create_page_embeddings_lock = asyncio.Lock()
+        self.compute_subarchives_lock = asyncio.Lock()
+        self.contents_lock = asyncio.Lock()
+        self.background_task_semaphore = asyncio.Semaphore(BACKGROUND_TASK_LIMIT)
+
+    def is_rwlock_locked(self) -> bool:
+        """
+        Whether a job currently holds RWLOCK, either as reader or as writer.
+        """
+        return self.RWLOCK.writer.locked or self.RWLOCK.reader.locked
+
+async def get_lock_state(request: Request):
+    return request.app.state.lock_state
 LockStateT: TypeAlias = Annotated[LockState, Depends(get_lock_state)]
+
+async def _run_background_task(lock_state: LockState, task: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+    try:
+        return await task(*args, **kwargs)
+    finally:
+        lock_state.background_task_semaphore.release()
+
+async def queue_background_task(
+        background_tasks: BackgroundTasks, lock_state: LockState, task: Callable[..., Awaitable[T]], *args, **kwargs
+) -> bool:
+    """
+    Queue a background task if one of the `BACKGROUND_TASK_LIMIT` slots is free, and return whether it was queued.
+
+    The slot is claimed before the task is queued and released when the task finishes, so a queued task
+    never waits for a slot and the router can refuse the job (503) instead of acknowledging it.
+    """
+    semaphore = lock_state.background_task_semaphore
+    if semaphore.locked():
+        return False
+    # a free slot is taken without suspending, so no other request can claim it in between.
+    await semaphore.acquire()
+    background_tasks.add_task(_run_background_task, lock_state, task, *args, **kwargs)
+    return True
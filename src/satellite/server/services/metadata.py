@@ -8,6 +8,7 @@ from typing import Tuple
 from aiohttp import ClientConnectionError
 from aiorwlock import RWLock
 from lanraragi.client import LRRClient
+from lanraragi.models import LanraragiResponse
 from lanraragi.utils import get_source_from_tags
 from satellite.models import MetadataPluginTaskStatus
 from satellite.service.database import DatabaseService
@@ -15,43 +16,66 @@ from satellite.service.metadata import MetadataService, NhentaiArchivistMetadata
 
 logger = logging.getLogger("uvicorn.satellite")
 
+# LANraragi responses worth retrying a plugin call on. A failing plugin itself is not retried,
+# since NOT_FOUND handling already backs those off over days.
+_PLUGIN_RETRY_STATUS_CODES = {429, 502, 503, 504}
+_PLUGIN_MAX_RETRIES = 4
+
+async def _use_plugin_with_retry(lanraragi: LRRClient, namespace: str, arcid: str, source: str) -> LanraragiResponse:
+    """
+    Invoke a metadata plugin, retrying rate-limited, unavailable or unreachable responses
+    with exponential backoff and full jitter.
+    """
+    retry_count = 0
+    while True:
+        try:
+            response = await lanraragi.use_plugin(namespace, arcid, source)
+            if response.status_code not in _PLUGIN_RETRY_STATUS_CODES or retry_count >= _PLUGIN_MAX_RETRIES:
+                return response
+            reason = f"status {response.status_code}"
+        except ClientConnectionError as connection_error:
+            if retry_count >= _PLUGIN_MAX_RETRIES:
+                raise
+            reason = str(connection_error)
+        time_to_sleep = random.uniform(0, 2 ** (retry_count + 1))
+        retry_count += 1
+        logger.warning(f"[metadata_plugin_{namespace}] Plugin call for {arcid} failed ({reason}); retry {retry_count}/{_PLUGIN_MAX_RETRIES} in {time_to_sleep:.1f}s.")
+        await asyncio.sleep(time_to_sleep)
+
 async def update_metadata(lanraragi: LRRClient, metadata_service: MetadataService, lock: RWLock):
-    try:
-        if lock.writer.locked or lock.reader.locked:
-            logger.warning("[update_metadata] Lock conflict, backing off.")
+    if lock.writer.locked or lock.reader.locked:
+        logger.warning("[update_metadata] Lock conflict, backing off.")
+        return
+    async with lock.writer_lock:
+        start_time = time.time()
+        untagged_archives = (await lanraragi.get_untagged_archives()).data
+        if not untagged_archives:
+            logger.info("[update_metadata] No untagged archives.")
             return
-        async with lock.writer_lock:
-            start_time = time.time()
-            untagged_archives = (await lanraragi.get_untagged_archives()).data
-            if not untagged_archives:
-                logger.info("[update_metadata] No untagged archives.")
-                return
-            logger.info(f"[update_metadata] Collected {len(untagged_archives)} untagged archives.")
-            
-            semaphore = Semaphore(value=8)
-            async def __handle_archive_id(archive_id: str):
-                async with semaphore:
-                    archive_metadata_response = await lanraragi.get_archive_metadata(archive_id)
-                    title = archive_metadata_response.title
-                    pixiv_id = metadata_service.get_id_from_title(title)
-                    metadata = await metadata_service.get_metadata_from_id(pixiv_id)
-                    retry_count = 0
-                    while True:
-                        try:
-                            response = await lanraragi.update_archive(
-                                archive_id, title=metadata.title, tags=metadata.tags, summary=metadata.summary
-                            )
-                            logger.info(f"[update_metadata] metadata updated: {archive_id}")
-                            return (archive_id, response.status_code)
-                        except ClientConnectionError:
-                            time_to_sleep = 2 ** (retry_count + 1)
-                            await asyncio.sleep(time_to_sleep)
-            tasks = [asyncio.create_task(__handle_archive_id(archive_id)) for archive_id in untagged_archives]
-            await asyncio.gather(*tasks)
-            total_time = time.time() - start_time
-            logger.info(f"[update_metadata] {len(tasks)} archives updated. Total time: {total_time}s.")
-    finally:
-        await lanraragi.close()
+        logger.info(f"[update_metadata] Collected {len(untagged_archives)} untagged archives.")
+        
+        semaphore = Semaphore(value=8)
+        async def __handle_archive_id(archive_id: str):
+            async with semaphore:
+                archive_metadata_response = await lanraragi.get_archive_metadata(archive_id)
+                title = archive_metadata_response.title
+                pixiv_id = metadata_service.get_id_from_title(title)
+                metadata = await metadata_service.get_metadata_from_id(pixiv_id)
+                retry_count = 0
+                while True:
+                    try:
+                        response = await lanraragi.update_archive(
+                            archive_id, title=metadata.title, tags=metadata.tags, summary=metadata.summary
+                        )
+                        logger.info(f"[update_metadata] metadata updated: {archive_id}")
+                        return (archive_id, response.status_code)
+                    except ClientConnectionError:
+                        time_to_sleep = 2 ** (retry_count + 1)
+                        await asyncio.sleep(time_to_sleep)
+        tasks = [asyncio.create_task(__handle_archive_id(archive_id)) for archive_id in untagged_archives]
+        await asyncio.gather(*tasks)
+        total_time = time.time() - start_time
+        logger.info(f"[update_metadata] {len(tasks)} archives updated. Total time: {total_time}s.")
 
 async def update_metadata_from_plugin(
         lanraragi: LRRClient, database: DatabaseService, namespace: str, lock: RWLock, avg_sleep_time: float, retry_ok: bool=False
@@ -79,7 +103,7 @@ async def update_metadata_from_plugin(
             return 1
 
         # invoke plugin: follow-up with sleep.
-        plugin_response = await lanraragi.use_plugin(namespace, arcid, source)
+        plugin_response = await _use_plugin_with_retry(lanraragi, namespace, arcid, source)
         time_to_sleep = random.random() * avg_sleep_time # sleep with delay
         await asyncio.sleep(time_to_sleep)
         if plugin_response.success:
@@ -122,75 +146,72 @@ async def update_metadata_from_plugin(
             logger.warning(f"[metadata_plugin_{namespace}] Task [{task_i + 1}/{total_tasks}] NOT_FOUND: {source}")
             return 0
 
-    try:
-        if lock.writer.locked or lock.reader.locked:
-            logger.warning("[metadata_plugin] Already running task.")
+    if lock.writer.locked or lock.reader.locked:
+        logger.warning("[metadata_plugin] Already running task.")
+        return
+    async with lock.writer_lock:
+        start_time = time.time()
+        if namespace == "pixivmetadata":
+            get_id_from_title = PixivUtil2MetadataService.get_id_from_title
+            source_template = "https://www.pixiv.net/en/artworks/{id}"
+        elif namespace == "nhplugin":
+            get_id_from_title = NhentaiArchivistMetadataService.get_id_from_title
+            source_template = "nhentai.net/g/{id}"
+        else:
+            logger.error(f"[metadata_plugin] Invalid or unsupported plugin namespace: {namespace}")
+            return
+
+        response = await lanraragi.get_all_archives()
+        if response.status_code != 200:
+            logger.error(f"[metadata_plugin_{namespace}] Failed to get archives (status {response.status_code}): {response.error}")
             return
-        async with lock.writer_lock:
-            start_time = time.time()
-            if namespace == "pixivmetadata":
-                get_id_from_title = PixivUtil2MetadataService.get_id_from_title
-                source_template = "https://www.pixiv.net/en/artworks/{id}"
-            elif namespace == "nhplugin":
-                get_id_from_title = NhentaiArchivistMetadataService.get_id_from_title
-                source_template = "nhentai.net/g/{id}"
+        for archive in response.data:
+            arcid = archive["arcid"]
+            if await database.get_metadata_plugin_task_by_arcid(arcid):
+                continue
+            metadata_response = await lanraragi.get_archive_metadata(arcid)
+            title: str = metadata_response.title
+            tags: str = metadata_response.tags
+            # get source from metadata if exists (by title or source tag)
+            source: str
+            if _source := get_source_from_tags(tags):
+                source = _source
+            elif _id := get_id_from_title(title):
+                source = source_template.format(id=_id)
             else:
-                logger.error(f"[metadata_plugin] Invalid or unsupported plugin namespace: {namespace}")
-                return
-
-            response = await lanraragi.get_all_archives()
-            if response.status_code != 200:
-                logger.error(f"[metadata_plugin_{namespace}] Failed to get archives (status {response.status_code}): ", str(response.error))
-                return
-            for archive in response.data:
-                arcid = archive["arcid"]
-                if await database.get_metadata_plugin_task_by_arcid(arcid):
-                    continue
-                metadata_response = await lanraragi.get_archive_metadata(arcid)
-                title: str = metadata_response.title
-                tags: str = metadata_response.tags
-                # get source from metadata if exists (by title or source tag)
-                source: str
-                if _source := get_source_from_tags(tags):
-                    source = _source
-                elif _id := get_id_from_title(title):
-                    source = source_template.format(id=_id)
-                else:
-                    logger.error(f"[metadata_plugin_{namespace}] ERROR No source found for arcid {arcid}.")
-                    await database.update_metadata_plugin_task(arcid, None, namespace, MetadataPluginTaskStatus.ERROR.value, time.time(), 0)
-                # for remaining sources, add them to database with PENDING.
-                await database.update_metadata_plugin_task(arcid, source, namespace, MetadataPluginTaskStatus.PENDING.value, time.time(), 0)
-                logger.info(f"[metadata_plugin_{namespace}] PENDING: {arcid}")
-            logger.info(f"[metadata_plugin_{namespace}] Completed inventory of metadata plugins.")
-
-            num_metadata_updated = 0
-
-            if retry_ok:
-                # collect all OK tasks and re-fetch metadata for them.
-                logger.info(f"[metadata_plugin_{namespace}] Start getting OK tasks...")
-                ok_tasks = await database.get_metadata_plugin_task_by_status_and_namespace(MetadataPluginTaskStatus.OK.value, namespace)
-                num_ok_tasks = len(ok_tasks)
-                logger.info(f"[metadata_plugin_{namespace}] Retrieved {num_ok_tasks} OK tasks.")
-                for i, task in enumerate(ok_tasks):
-                    num_metadata_updated += await __handle_task(task, i, num_ok_tasks)
-
-            # now collect all PENDING tasks and fetch metadata for them.
-            logger.info(f"[metadata_plugin_{namespace}] Start getting PENDING tasks...")
-            pending_metadata_tasks = await database.get_metadata_plugin_task_by_status_and_namespace(MetadataPluginTaskStatus.PENDING.value, namespace)
-            num_pending_tasks = len(pending_metadata_tasks)
-            logger.info(f"[metadata_plugin_{namespace}] Retrieved {num_pending_tasks} PENDING tasks.")
-            for i, pending_metadata_task in enumerate(pending_metadata_tasks):
-                num_metadata_updated += await __handle_task(pending_metadata_task, i, num_pending_tasks)
-
-            # now collect all NOT_FOUND tasks whose donotscan have expired and fetch metadata for them.
-            logger.info(f"[metadata_plugin_{namespace}] Start getting NOT_FOUND tasks...")
-            failed_metadata_tasks = await database.get_metadata_plugin_task_expired(time.time())
-            num_failed_tasks = len(failed_metadata_tasks)
-            logger.info(f"[metadata_plugin_{namespace}] Retrieved {num_failed_tasks} NOT_FOUND tasks.")
-            for i, failed_task in enumerate(failed_metadata_tasks):
-                num_metadata_updated += await __handle_task(failed_task, i, num_failed_tasks)
-            
-            total_time = time.time() - start_time
-            logger.info(f"[metadata_plugin_{namespace}] Updated metadata for {num_metadata_updated} archives; Total time: {total_time}s.")
-    finally:
-        await lanraragi.close()
\ No newline at end of file
+                logger.error(f"[metadata_plugin_{namespace}] ERROR No source found for arcid {arcid}.")
+                await database.update_metadata_plugin_task(arcid, None, namespace, MetadataPluginTaskStatus.ERROR.value, time.time(), 0)
+            # for remaining sources, add them to database with PENDING.
+            await database.update_metadata_plugin_task(arcid, source, namespace, MetadataPluginTaskStatus.PENDING.value, time.time(), 0)
+            logger.info(f"[metadata_plugin_{namespace}] PENDING: {arcid}")
+        logger.info(f"[metadata_plugin_{namespace}] Completed inventory of metadata plugins.")
+
+        num_metadata_updated = 0
+
+        if retry_ok:
+            # collect all OK tasks and re-fetch metadata for them.
+            logger.info(f"[metadata_plugin_{namespace}] Start getting OK tasks...")
+            ok_tasks = await database.get_metadata_plugin_task_by_status_and_namespace(MetadataPluginTaskStatus.OK.value, namespace)
+            num_ok_tasks = len(ok_tasks)
+            logger.info(f"[metadata_plugin_{namespace}] Retrieved {num_ok_tasks} OK tasks.")
+            for i, task in enumerate(ok_tasks):
+                num_metadata_updated += await __handle_task(task, i, num_ok_tasks)
+
+        # now collect all PENDING tasks and fetch metadata for them.
+        logger.info(f"[metadata_plugin_{namespace}] Start getting PENDING tasks...")
+        pending_metadata_tasks = await database.get_metadata_plugin_task_by_status_and_namespace(MetadataPluginTaskStatus.PENDING.value, namespace)
+        num_pending_tasks = len(pending_metadata_tasks)
+        logger.info(f"[metadata_plugin_{namespace}] Retrieved {num_pending_tasks} PENDING tasks.")
+        for i, pending_metadata_task in enumerate(pending_metadata_tasks):
+            num_metadata_updated += await __handle_task(pending_metadata_task, i, num_pending_tasks)
+
+        # now collect all NOT_FOUND tasks whose donotscan have expired and fetch metadata for them.
+        logger.info(f"[metadata_plugin_{namespace}] Start getting NOT_FOUND tasks...")
+        failed_metadata_tasks = await database.get_metadata_plugin_task_expired(time.time())
+        num_failed_tasks = len(failed_metadata_tasks)
+        logger.info(f"[metadata_plugin_{namespace}] Retrieved {num_failed_tasks} NOT_FOUND tasks.")
+        for i, failed_task in enumerate(failed_metadata_tasks):
+            num_metadata_updated += await __handle_task(failed_task, i, num_failed_tasks)
+        
+        total_time = time.time() - start_time
+        logger.info(f"[metadata_plugin_{namespace}] Updated metadata for {num_metadata_updated} archives; Total time: {total_time}s.")
\ No newline at end of file
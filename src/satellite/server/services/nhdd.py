@@ -1,12 +1,38 @@
 import asyncio
 import logging
 import time
+from typing import Dict, Tuple, Union
 
 from satellite.service.nhdd import DeduplicationService
 
 
 LOGGER = logging.getLogger("uvicorn.satellite")
 
+# archive ID -> (expiry time, is duplicate, duplicate of), so repeated lookups skip the database.
+_SUBARCHIVE_INFO_TTL = 60
+_SUBARCHIVE_INFO_MAX_SIZE = 65536
+_subarchive_info: Dict[str, Tuple[float, bool, Union[str, None]]] = {}
+
+def clear_subarchive_info_cache():
+    """
+    Forget all cached subarchive lookups; must be called whenever the subarchive map changes.
+    """
+    _subarchive_info.clear()
+
+async def get_subarchive_info(archive_id: str, dd_service: DeduplicationService) -> Tuple[bool, Union[str, None]]:
+    """
+    Cached `DeduplicationService.get_subarchive_info`; entries expire after `_SUBARCHIVE_INFO_TTL` seconds.
+    """
+    now = time.time()
+    cached = _subarchive_info.get(archive_id)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+    is_duplicate, duplicate_of = await dd_service.get_subarchive_info(archive_id)
+    if len(_subarchive_info) >= _SUBARCHIVE_INFO_MAX_SIZE:
+        _subarchive_info.clear()
+    _subarchive_info[archive_id] = (now + _SUBARCHIVE_INFO_TTL, is_duplicate, duplicate_of)
+    return is_duplicate, duplicate_of
+
 async def create_page_embeddings(lock: asyncio.Lock, dd_service: DeduplicationService):
     LOGGER.info("Creating page embeddings.")
     start = time.time()
@@ -35,12 +61,13 @@ async def update_nhentai_archives_data(
     finally:
         await dd_service.close()
 
-async def compute_subarchives(lock: asyncio.Lock, dd_service: DeduplicationService):
+async def compute_subarchives(lock: asyncio.Lock, dd_service: DeduplicationService, min_similarity: float=0.95):
     LOGGER.info("Updating subarchives table. This may take a while...")
     start = time.time()
     try:
         async with lock:
-            await dd_service.compute_subarchives()
+            await dd_service.compute_subarchives(min_similarity=min_similarity)
+            clear_subarchive_info_cache()
         LOGGER.info(f"Completed subarchives job. Time: {time.time() - start}")
         return
     finally:
@@ -52,6 +79,8 @@ async def remove_duplicates(is_dry_run: bool, lock: asyncio.Lock, dd_service: De
     try:
         async with lock:
             results = await dd_service.remove_duplicate_archives_nhentai_archivist(is_dry_run=is_dry_run)
+            if not is_dry_run:
+                clear_subarchive_info_cache()
         LOGGER.info(f"Completed deduplication job. Time: {time.time() - start}s")
         return results
     finally:
@@ -1,14 +1,14 @@
 import asyncio
+from contextlib import asynccontextmanager
 import enum
 import io
 import logging
 import os
 from pathlib import Path
 import random
-import tempfile
 import time
 import traceback
-from typing import Dict, List, Set, Tuple, Union, overload
+from typing import AsyncIterator, Dict, List, Set, Tuple, Union, overload
 import zipfile
 import PIL.Image
 import aiohttp
@@ -17,29 +17,49 @@ import dotenv
 import numpy
 import pgvector.psycopg
 import psycopg
+import psycopg.adapt
+import psycopg.pq
+import psycopg_pool
 
 from common.client import AbstractAsyncHTTPContextClient
 from lanraragi.client import LRRClient
 from lanraragi.utils import get_source_from_tags
 from satellite.utils.fdiscover import discover_all_archives_in_folder
 
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
 LOGGER = logging.getLogger("NHDD")
 
 # >>>>> COMMON >>>>>
 
 DEFAULT_EMBEDDING_DIMENSIONS = 512
-
-def cosine_similarity(embedding_1: List[float], embedding_2: List[float]):
-    embedding_1 = numpy.array(embedding_1)
-    embedding_2 = numpy.array(embedding_2)
-    result = numpy.dot(embedding_1, embedding_2) / (numpy.linalg.norm(embedding_1) * numpy.linalg.norm(embedding_2))
+DEFAULT_IMG2VEC_BATCH_SIZE = 4
+
+def cosine_similarity(embedding_1: Union[List[float], numpy.ndarray], embedding_2: Union[List[float], numpy.ndarray]):
+    if simsimd is not None:
+        # simsimd returns the cosine distance from a SIMD kernel.
+        return 1.0 - simsimd.cosine(numpy.asarray(embedding_1, dtype=numpy.float32), numpy.asarray(embedding_2, dtype=numpy.float32))
+    # asarray does not copy arrays; one sqrt of the product of squared norms avoids `linalg.norm` overhead.
+    embedding_1 = numpy.asarray(embedding_1)
+    embedding_2 = numpy.asarray(embedding_2)
+    result = numpy.dot(embedding_1, embedding_2) / numpy.sqrt(numpy.vdot(embedding_1, embedding_1) * numpy.vdot(embedding_2, embedding_2))
     return result
 
-def _convert_embedding(embedding: str) -> List[float]:
-    resp = [float(x.strip()) for x in embedding[1:-1].split(',')]
-    return resp
+def normalize_embedding(embedding: Union[List[float], numpy.ndarray]) -> numpy.ndarray:
+    """
+    Return the embedding as an L2-normalized float32 array (zero vectors are returned unchanged), so
+    that the cosine similarity of stored embeddings is their dot product.
+    """
+    embedding = numpy.asarray(embedding, dtype=numpy.float32)
+    norm = numpy.linalg.norm(embedding)
+    if norm == 0:
+        return embedding
+    return embedding / norm
 
-def is_subsequence(embeddings_1: List[float], embeddings_2: List[float], min_similarity: float=0.95) -> Tuple[bool, bool]:
+def is_subsequence(embeddings_1: List[List[float]], embeddings_2: List[List[float]], min_similarity: float=0.95) -> Tuple[bool, bool]:
     """
     CPU-bound part of archive similarity computation.
     Compares the first list of embeddings to the second and checks whether its
@@ -50,20 +70,32 @@ def is_subsequence(embeddings_1: List[float], embeddings_2: List[float], min_sim
     """
     t_count = len(embeddings_1)
     s_count = len(embeddings_2)
-    if t_count > s_count:
+    if t_count > s_count or t_count == 0:
         return (False, False)
+    # normalize once and compute every pairwise similarity in one matrix product,
+    # instead of calling `cosine_similarity` per pair. New embeddings are stored normalized,
+    # but rows inserted before that may not be; normalizing is cheap next to the product.
+    embeddings_1 = numpy.asarray(embeddings_1, dtype=numpy.float64)
+    embeddings_2 = numpy.asarray(embeddings_2, dtype=numpy.float64)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        embeddings_1 = embeddings_1 / numpy.linalg.norm(embeddings_1, axis=1, keepdims=True)
+        embeddings_2 = embeddings_2 / numpy.linalg.norm(embeddings_2, axis=1, keepdims=True)
+    similarity_scores = embeddings_1 @ embeddings_2.T
+    debug = LOGGER.isEnabledFor(logging.DEBUG)
     offset = 0
     for i in range(t_count):
+        row = similarity_scores[i]
         while i + offset < s_count:
-            similarity_score = cosine_similarity(embeddings_1[i], embeddings_2[i+offset])
-            if similarity_score > min_similarity:
-                LOGGER.debug(f"page-{i+1} ~ page-{i+offset+1}")
+            if row[i+offset] > min_similarity:
+                if debug:
+                    LOGGER.debug(f"page-{i+1} ~ page-{i+offset+1}")
                 if i == t_count-1:
                     return (True, t_count != s_count)
                 else:
                     break
             else:
-                LOGGER.debug(f"page-{i+1} !~ page-{i+offset+1}")
+                if debug:
+                    LOGGER.debug(f"page-{i+1} !~ page-{i+offset+1}")
                 offset += 1
                 continue
     return (False, False)
@@ -77,6 +109,22 @@ def _get_source(tags: List[str]) -> int:
             return int(tag.split("/")[-1])
     return -1
 
+def _decode_archive_pages(archive: io.BytesIO) -> List[Tuple[PIL.Image.Image, int]]:
+    """
+    CPU-bound page decoding: return the (RGB image, page number) of each top-level image in a zip archive,
+    in filename order.
+    """
+    image_page_pairs: List[Tuple[PIL.Image.Image, int]] = []
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        images = sorted(
+            info.filename for info in zip_ref.infolist()
+            if not info.is_dir() and '/' not in info.filename and Path(info.filename).suffix.lower() in {".png", ".jpg", ".jpeg"}
+        )
+        for i, image in enumerate(images):
+            with zip_ref.open(image) as reader:
+                image_page_pairs.append((PIL.Image.open(reader).convert('RGB'), i + 1))
+    return image_page_pairs
+
 class CreateEmbeddingResponse:
     status: int
     embeddings: List[float]
@@ -104,9 +152,16 @@ class Img2VecClient(AbstractAsyncHTTPContextClient):
         return f"{self.host}{api}"
 
     @staticmethod
-    def to_bytes(image: PIL.Image.Image) -> bytes:
+    def to_bytes(image: PIL.Image.Image, fmt: str='JPEG') -> bytes:
+        """
+        Encode an image for upload. Lossy JPEG at quality 90 is indistinguishable to the embedding model,
+        but far smaller and faster to encode than PNG.
+        """
         buffer = io.BytesIO()
-        image.save(buffer, format='PNG')
+        if fmt == 'PNG':
+            image.save(buffer, format='PNG')
+        else:
+            image.convert('RGB').save(buffer, format=fmt, quality=90)
         return buffer.getvalue()
 
     async def get_healthcheck(self) -> bool:
@@ -120,7 +175,7 @@ class Img2VecClient(AbstractAsyncHTTPContextClient):
     async def create_embedding(self, image: PIL.Image.Image) -> CreateEmbeddingResponse:
         url = self.build_url("/api/embeddings")
         response = CreateEmbeddingResponse()
-        image_bytes = self.to_bytes(image)
+        image_bytes = await asyncio.to_thread(self.to_bytes, image)
         data = aiohttp.FormData(quote_fields=False)
         data.add_field('file', image_bytes)
         async with (await self._get_session()).post(url=url, data=data) as async_response:
@@ -133,9 +188,10 @@ class Img2VecClient(AbstractAsyncHTTPContextClient):
         url = self.build_url("/api/embeddings-batch")
         response = BatchCreateEmbeddingResponse()
         data = aiohttp.FormData(quote_fields=False)
-        for (i, image) in enumerate(images):
-            image_bytes = self.to_bytes(image)
-            data.add_field('files', image_bytes, filename=f'image_{i}.png')
+        # encode off the event loop and in parallel; PIL releases the GIL while encoding.
+        encoded_images = await asyncio.gather(*(asyncio.to_thread(self.to_bytes, image) for image in images))
+        for (i, image_bytes) in enumerate(encoded_images):
+            data.add_field('files', image_bytes, filename=f'image_{i}.jpg')
         async with (await self._get_session()).post(url=url, data=data) as async_response:
             response.status = async_response.status
             if async_response.status == 200:
@@ -190,33 +246,46 @@ class CreatePageResponse:
     pages: int
 # <<<<< MODEL <<<<<
 
+_LANGUAGE_TAGS = {
+    "language:english": NhArchiveLanguage.ENGLISH,
+    "language:chinese": NhArchiveLanguage.CHINESE,
+    "language:japanese": NhArchiveLanguage.JAPANESE,
+    "language:translated": NhArchiveLanguage.OTHER,
+}
+# lower is preferred when an archive has several language tags.
+_LANGUAGE_PRIORITY = {
+    NhArchiveLanguage.ENGLISH: 0,
+    NhArchiveLanguage.CHINESE: 1,
+    NhArchiveLanguage.JAPANESE: 2,
+    NhArchiveLanguage.OTHER: 3,
+    NhArchiveLanguage.NO_TRANSLATE: 4,
+}
+
 def get_language(tags: List[str]) -> NhArchiveLanguage:
-    languages = set()
+    language = NhArchiveLanguage.NO_TRANSLATE
     for tag in tags:
-        match tag.lower():
-            case "language:japanese":
-                languages.add(NhArchiveLanguage.JAPANESE)
-            case "language:english":
-                languages.add(NhArchiveLanguage.ENGLISH)
-            case "language:chinese":
-                languages.add(NhArchiveLanguage.CHINESE)
-            case "language:translated":
-                languages.add(NhArchiveLanguage.OTHER)
-    if languages:
-        if NhArchiveLanguage.ENGLISH in languages:
-            return NhArchiveLanguage.ENGLISH
-        if NhArchiveLanguage.CHINESE in languages:
-            return NhArchiveLanguage.CHINESE
-        if NhArchiveLanguage.JAPANESE in languages:
-            return NhArchiveLanguage.JAPANESE
-        return NhArchiveLanguage.OTHER
-    return NhArchiveLanguage.NO_TRANSLATE
+        tag_language = _LANGUAGE_TAGS.get(tag.lower())
+        if tag_language is None:
+            continue
+        if tag_language is NhArchiveLanguage.ENGLISH:
+            return tag_language
+        if _LANGUAGE_PRIORITY[tag_language] < _LANGUAGE_PRIORITY[language]:
+            language = tag_language
+    return language
 
 # >>>>> TABLE GET/SET >>>>>
 def get_archive_embedding_job_pages(row):
     return row[1]
-def get_archive_embedding_job_status(row):
-    return row[2]
+def get_archive_embedding_job_status(row) -> ArchiveEmbeddingJobStatus:
+    return ArchiveEmbeddingJobStatus(row[2])
+
+def _get_embedding_job_status_value(status: Union[str, ArchiveEmbeddingJobStatus]) -> int:
+    """
+    archive_embedding_job.status stores the enum value; accepts a status or its name.
+    """
+    if isinstance(status, str):
+        status = ArchiveEmbeddingJobStatus[status]
+    return status.value
 
 def get_page_archive_id(row):
     return row[0]
@@ -226,6 +295,47 @@ def get_page_embedding(row):
 # <<<<< TABLE GET/SET <<<<<
 
 # >>>>> DATABASE >>>>>
+_DB_POOL_MIN_SIZE = 4
+_DB_POOL_MAX_SIZE = 32
+# HNSW graph degree and build-time candidate list; higher than pgvector's defaults (16, 64) for better recall.
+_HNSW_M = 24
+_HNSW_EF_CONSTRUCTION = 200
+# query-time candidate list (pgvector default: 40); an index scan returns at most this many rows.
+_HNSW_EF_SEARCH = 80
+# largest hnsw.ef_search pgvector accepts; a larger `limit` is still applied, but the index scan returns fewer rows.
+_HNSW_EF_SEARCH_MAX = 1000
+# nearest pages considered when looking for archives similar to a first page.
+_FIRST_PAGE_NEIGHBORS = 100
+
+class _VectorNumpyLoader(psycopg.adapt.Loader):
+    """
+    Load a text vector column ("[x,y,...]") straight into a float32 ndarray; parsing happens in numpy.
+    """
+    format = psycopg.pq.Format.TEXT
+
+    def load(self, data) -> numpy.ndarray:
+        return numpy.fromstring(bytes(data)[1:-1], dtype=numpy.float32, sep=',')
+
+class _VectorNumpyBinaryLoader(psycopg.adapt.Loader):
+    """
+    Load a binary vector column (dim, unused, dim big-endian float32s) into a float32 ndarray.
+    """
+    format = psycopg.pq.Format.BINARY
+
+    def load(self, data) -> numpy.ndarray:
+        dim = int.from_bytes(data[:2], 'big')
+        return numpy.frombuffer(data, dtype='>f4', count=dim, offset=4).astype(numpy.float32)
+
+async def _configure_connection(aconn: psycopg.AsyncConnection):
+    """
+    Register pgvector types on a new connection, and load vector columns as numpy arrays
+    (pgvector's own loaders return `pgvector.Vector` objects).
+    """
+    await pgvector.psycopg.register_vector_async(aconn)
+    vector_oid = aconn.adapters.types['vector'].oid
+    aconn.adapters.register_loader(vector_oid, _VectorNumpyLoader)
+    aconn.adapters.register_loader(vector_oid, _VectorNumpyBinaryLoader)
+
 class PostgresDatabaseService:
     """
     Interface for postgres vector database. May throw psycopg.OperationalError which
@@ -238,15 +348,62 @@ class PostgresDatabaseService:
         self.host = host
         self.password = password
         self.embedding_dim = embedding_dim
+        self.pool: Union[None, psycopg_pool.AsyncConnectionPool] = None
+        self._pool_lock = asyncio.Lock()
 
     async def close(self):
-        return
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def _get_conninfo(self) -> str:
+        return f"dbname='{self.database}' user='{self.user}' host='{self.host}' password='{self.password}'"
+
+    async def _connect(self):
+        return await psycopg.AsyncConnection.connect(self._get_conninfo())
 
-    async def get_connection(self):
-        return await psycopg.AsyncConnection.connect(f"dbname='{self.database}' user='{self.user}' host='{self.host}' password='{self.password}'")
+    async def _get_pool(self) -> psycopg_pool.AsyncConnectionPool:
+        """
+        Open the connection pool on first use, i.e. after `setup_database` has created the vector extension.
+        """
+        async with self._pool_lock:
+            if self.pool is None:
+                pool = psycopg_pool.AsyncConnectionPool(
+                    self._get_conninfo(), min_size=_DB_POOL_MIN_SIZE, max_size=_DB_POOL_MAX_SIZE, open=False,
+                    # register pgvector types once per pooled connection, so vector columns are loaded as numpy arrays.
+                    configure=_configure_connection
+                )
+                await pool.open()
+                self.pool = pool
+            return self.pool
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """
+        Borrow a connection from the pool; it is committed (or rolled back on error) and returned on exit.
+        """
+        async with (await self._get_pool()).connection() as aconn:
+            yield aconn
+
+    @staticmethod
+    async def _copy_insert_ignore_conflicts(cursor: psycopg.AsyncCursor, table: str, columns: str, types: List[str], rows):
+        """
+        Bulk insert rows with `ON CONFLICT DO NOTHING` semantics: rows are streamed with a binary COPY into a
+        temporary staging table (dropped on commit), then moved over in a single INSERT ... SELECT.
+
+        Must be called inside a transaction.
+        """
+        staging_table = f"{table}_staging"
+        await cursor.execute(f'CREATE TEMP TABLE {staging_table} (LIKE {table}) ON COMMIT DROP')
+        async with cursor.copy(f'COPY {staging_table} {columns} FROM STDIN WITH (FORMAT BINARY)') as copy:
+            copy.set_types(types)
+            for row in rows:
+                await copy.write_row(row)
+        await cursor.execute(f'INSERT INTO {table} {columns} SELECT {columns[1:-1]} FROM {staging_table} ON CONFLICT DO NOTHING')
 
     async def setup_database(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        # the vector extension may not exist yet, so types cannot be registered up front.
+        async with await self._connect() as aconn, aconn.transaction():
             await aconn.execute('CREATE EXTENSION IF NOT EXISTS vector')
             await pgvector.psycopg.register_vector_async(aconn)
             LOGGER.info("Registered vector extension.")
@@ -255,12 +412,22 @@ class PostgresDatabaseService:
                 CREATE TABLE IF NOT EXISTS archive_embedding_job (
                     archive_id VARCHAR(255) PRIMARY KEY,
                     pages INTEGER,
-                    status VARCHAR(255),
+                    status SMALLINT,
                     last_updated REAL,
                     message TEXT
                 )
                 '''
             )
+            # migrate status names from earlier versions to their enum values.
+            column_type = await (await aconn.execute(
+                "SELECT data_type FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = 'archive_embedding_job' AND column_name = 'status'"
+            )).fetchone()
+            if column_type and column_type[0] != 'smallint':
+                cases = ' '.join(f"WHEN '{status.name}' THEN {status.value}" for status in ArchiveEmbeddingJobStatus)
+                await aconn.execute(f'ALTER TABLE archive_embedding_job ALTER COLUMN status TYPE SMALLINT USING (CASE status {cases} END)')
+                LOGGER.info("Migrated archive embedding job statuses to SMALLINT.")
+            # job polling filters by status and pages through archive IDs; counts by status become index-only.
+            await aconn.execute('CREATE INDEX IF NOT EXISTS archive_embedding_job_status_index ON archive_embedding_job (status, archive_id)')
             LOGGER.info("Created archive embedding job table.")
             await aconn.execute(
                 '''
@@ -272,6 +439,7 @@ class PostgresDatabaseService:
                 )
                 '''
             )
+            await aconn.execute('CREATE INDEX IF NOT EXISTS archive_metadata_job_status_index ON archive_metadata_job (status)')
             LOGGER.info("Created archive metadata job.")
             await aconn.execute(
                 f'''
@@ -282,7 +450,25 @@ class PostgresDatabaseService:
                     CONSTRAINT unique_archive_page UNIQUE (archive_id, page_no)
                 )
                 ''')
-            await aconn.execute('CREATE INDEX IF NOT EXISTS page_index ON page USING hnsw (embedding vector_cosine_ops)')
+            # index half-precision copies of the embeddings: halves the index size and the bytes each
+            # distance reads, while the table keeps full precision for reranking and is_subsequence.
+            await aconn.execute('DROP INDEX IF EXISTS page_index')
+            await aconn.execute(
+                f'''
+                CREATE INDEX IF NOT EXISTS page_halfvec_index ON page
+                USING hnsw ((embedding::halfvec({self.embedding_dim})) halfvec_cosine_ops)
+                WITH (m = {_HNSW_M}, ef_construction = {_HNSW_EF_CONSTRUCTION})
+                '''
+            )
+            # first pages are searched on their own when looking for candidate duplicates.
+            await aconn.execute(
+                f'''
+                CREATE INDEX IF NOT EXISTS page_first_halfvec_index ON page
+                USING hnsw ((embedding::halfvec({self.embedding_dim})) halfvec_cosine_ops)
+                WITH (m = {_HNSW_M}, ef_construction = {_HNSW_EF_CONSTRUCTION})
+                WHERE page_no = 1
+                '''
+            )
             LOGGER.info("Created page embedding table.")
             await aconn.execute(
                 '''
@@ -307,106 +493,133 @@ class PostgresDatabaseService:
             LOGGER.info("Created nhentai archive table.")
 
     async def clear_archive_embedding_job_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
-            await aconn.execute('DELETE FROM archive_embedding_job')
+        async with self.connection() as aconn, aconn.transaction():
+            await aconn.execute('TRUNCATE TABLE archive_embedding_job')
 
     async def drop_archive_embedding_job_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DROP TABLE IF EXISTS archive_embedding_job')
 
     async def drop_page_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DROP TABLE IF EXISTS page')
 
     async def clear_page_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
-            await aconn.execute('DELETE FROM page')
+        async with self.connection() as aconn, aconn.transaction():
+            await aconn.execute('TRUNCATE TABLE page')
 
     async def drop_subarchive_map_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DROP TABLE IF EXISTS subarchive_map')
     
     async def clear_subarchive_map_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
-            await aconn.execute('DELETE FROM subarchive_map')
+        async with self.connection() as aconn, aconn.transaction():
+            await aconn.execute('TRUNCATE TABLE subarchive_map')
 
     async def drop_nhentai_metadata_job_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DROP TABLE IF EXISTS archive_metadata_job')
 
     async def clear_archive_metadata_job_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
-            await aconn.execute('DELETE FROM archive_metadata_job')
+        async with self.connection() as aconn, aconn.transaction():
+            await aconn.execute('TRUNCATE TABLE archive_metadata_job')
 
     async def drop_nhentai_archive_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DROP TABLE IF EXISTS nhentai_archive')
 
     async def clear_nhentai_archive_table(self):
-        async with await self.get_connection() as aconn, aconn.transaction():
-            await aconn.execute('DELETE FROM nhentai_archive')
+        async with self.connection() as aconn, aconn.transaction():
+            await aconn.execute('TRUNCATE TABLE nhentai_archive')
 
     # >>>>> ARCHIVE EMBEDDING CRUD >>>>>
-    async def get_archive_embedding_job(self, archive_id: str) -> Union[Tuple[str, int, str, float, str], None]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
-            row = await (await cursor.execute('SELECT * FROM archive_embedding_job WHERE archive_id = %s', (archive_id,))).fetchone()
+    async def get_archive_embedding_job(self, archive_id: str) -> Union[Tuple[str, int, int, float, str], None]:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
+            row = await (await cursor.execute('SELECT * FROM archive_embedding_job WHERE archive_id = %s', (archive_id,), prepare=True)).fetchone()
             return row
 
     async def get_pages_from_aej(self, archive_id: str) -> int:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('SELECT pages FROM archive_embedding_job WHERE archive_id = %s', (archive_id,))).fetchone()
             if row:
                 return row[0]
             return None
 
     async def get_num_archive_embedding_jobs_by_status(self, status: ArchiveEmbeddingJobStatus) -> int:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
-            row = await (await cursor.execute('SELECT COUNT(*) FROM archive_embedding_job WHERE status = %s', (status.name,))).fetchone()
+        async with self.connection() as aconn, aconn.cursor() as cursor:
+            row = await (await cursor.execute('SELECT COUNT(*) FROM archive_embedding_job WHERE status = %s', (status.value,))).fetchone()
             if row:
                 return row[0]
             return 0
 
-    async def get_archive_embedding_jobs_by_status(self, status: str, limit: int=None) -> List[Tuple[str, int, str, float, str]]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+    async def has_archive_embedding_jobs_by_status(self, status: ArchiveEmbeddingJobStatus) -> bool:
+        """
+        Return whether any archive embedding job has the given status, e.g. whether work is left;
+        stops at the first match instead of counting.
+        """
+        async with self.connection() as aconn, aconn.cursor() as cursor:
+            row = await (await cursor.execute(
+                'SELECT EXISTS (SELECT 1 FROM archive_embedding_job WHERE status = %s)', (status.value,)
+            )).fetchone()
+            return row[0]
+
+    async def get_archive_embedding_job_status_counts(self) -> Dict[ArchiveEmbeddingJobStatus, int]:
+        """
+        Return the number of archive embedding jobs of each status in one query.
+        Statuses without jobs are omitted.
+        """
+        async with self.connection() as aconn, aconn.cursor() as cursor:
+            rows = await (await cursor.execute('SELECT status, COUNT(*) FROM archive_embedding_job GROUP BY status')).fetchall()
+            statuses = {status.value: status for status in ArchiveEmbeddingJobStatus}
+            return {
+                statuses[status]: count for status, count in rows if status in statuses
+            }
+
+    async def get_archive_embedding_jobs_by_status(
+            self, status: Union[str, ArchiveEmbeddingJobStatus], limit: int=None
+    ) -> List[Tuple[str, int, int, float, str]]:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             query = 'SELECT * FROM archive_embedding_job WHERE status = %s ORDER BY archive_id ASC'
-            params = [status]
+            params = [_get_embedding_job_status_value(status)]
             if limit:
                 query += ' LIMIT %s'
                 params.append(limit)
             row = await (await cursor.execute(query, params)).fetchall()
             return row
 
-    async def insert_archive_embedding_job(self, archive_id: str, pages: int, status: str, message: str=None):
-        async with await self.get_connection() as aconn, aconn.transaction():
+    async def insert_archive_embedding_job(self, archive_id: str, pages: int, status: Union[str, ArchiveEmbeddingJobStatus], message: str=None):
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 INSERT INTO archive_embedding_job aej(archive_id, pages, status, last_updated, message)
                                 VALUES (%s, %s, %s, %s, %s)
                                 ON CONFLICT (archive_id)
                                 DO NOTHING
-                                ''', (archive_id, pages, status, time.time(), message))
+                                ''', (archive_id, pages, _get_embedding_job_status_value(status), time.time(), message))
     
     async def insert_archive_embedding_jobs(self, aej_items: List[Tuple[str, int, str, str]]):
-        async with await self.get_connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
-            await cursor.executemany('''
-                                    INSERT INTO archive_embedding_job (archive_id, pages, status, last_updated, message)
-                                    VALUES (%s, %s, %s, %s, %s)
-                                    ON CONFLICT (archive_id)
-                                    DO NOTHING
-                                    ''', [(job[0], job[1], job[2], time.time(), job[3]) for job in aej_items])
-
-    async def update_archive_embedding_job(self, archive_id: str, status: str, message: str=None):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        if not aej_items:
+            return
+        last_updated = time.time()
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+            await self._copy_insert_ignore_conflicts(
+                cursor, 'archive_embedding_job', '(archive_id, pages, status, last_updated, message)',
+                ['varchar', 'int4', 'int2', 'float4', 'text'],
+                ((job[0], job[1], _get_embedding_job_status_value(job[2]), last_updated, job[3]) for job in aej_items)
+            )
+
+    async def update_archive_embedding_job(self, archive_id: str, status: Union[str, ArchiveEmbeddingJobStatus], message: str=None):
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 UPDATE archive_embedding_job
                                 SET status = %s, last_updated = %s, message = %s
                                 WHERE archive_id = %s
-                                ''', (status, time.time(), message, archive_id))
+                                ''', (_get_embedding_job_status_value(status), time.time(), message, archive_id), prepare=True)
 
     # <<<<< ARCHIVE EMBEDDING CRUD <<<<<
 
     # >>>>> ARCHIVE METADATA CRUD >>>>>
     async def get_archive_metadata_job(self, archive_id: str) -> Union[Tuple[str, MetadataPluginStatus, str, float], None]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('''
                                                SELECT 
                                                archive_id, status, message, last_updated
@@ -420,22 +633,31 @@ class PostgresDatabaseService:
         """
         Get list of archive IDs by metadata job status.
         """
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute('SELECT archive_id FROM archive_metadata_job WHERE status = %s', (status.name,))).fetchall()
-            for i in range(len(rows)):
-                rows[i] = rows[i][0]
-            return rows
+            return [r[0] for r in rows]
 
     async def get_num_archive_metadata_jobs_by_status(self, status: MetadataPluginStatus) -> int:
         """
         Return number of archive metadata jobs by status (e.g. for tracking).
         """
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('SELECT COUNT(*) FROM archive_metadata_job WHERE status = %s', (status.name,))).fetchone()
             return row[0]
 
+    async def get_archive_metadata_job_status_counts(self) -> Dict[MetadataPluginStatus, int]:
+        """
+        Return the number of archive metadata jobs of each status in one query (e.g. for tracking).
+        Statuses without jobs are omitted.
+        """
+        async with self.connection() as aconn, aconn.cursor() as cursor:
+            rows = await (await cursor.execute('SELECT status, COUNT(*) FROM archive_metadata_job GROUP BY status')).fetchall()
+            return {
+                MetadataPluginStatus[status]: count for status, count in rows if status in MetadataPluginStatus.__members__
+            }
+
     async def insert_archive_metadata_job(self, archive_id: str, status: MetadataPluginStatus, message: str=None):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute(
                 '''
                 INSERT INTO archive_metadata_job (archive_id, status, message, last_updated)
@@ -446,7 +668,7 @@ class PostgresDatabaseService:
             )
     
     async def update_archive_metadata_job(self, archive_id: str, status: MetadataPluginStatus, message: str=None):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 UPDATE archive_metadata_job
                                 SET status = %s, message = %s
@@ -454,82 +676,67 @@ class PostgresDatabaseService:
                                 ''', (status.name, message, archive_id))
 
     async def delete_archive_metadata_job(self, archive_id: str):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DELETE FROM archive_metadata_job WHERE archive_id = %s', (archive_id,))
 
     # <<<<< ARCHIVE METADATA CRUD <<<<<
 
     # >>>>> PAGE CRUD >>>>>
 
-    async def get_page(self, archive_id: str, page_no: int) -> Union[None, Tuple[str, int, List[float]]]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+    async def get_page(self, archive_id: str, page_no: int) -> Union[None, Tuple[str, int, numpy.ndarray]]:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('''
                                               SELECT * FROM page WHERE archive_id = %s AND page_no = %s
-                                              ''', (archive_id, page_no))).fetchone()
-            result = (row[0], row[1], _convert_embedding(row[2]))
-            return result
+                                              ''', (archive_id, page_no), prepare=True)).fetchone()
+            return row
 
-    async def get_pages_by_archive_id(self, archive_id: str) -> List[Tuple[str, str, List[float]]]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+    async def get_pages_by_archive_id(self, archive_id: str) -> List[Tuple[str, int, numpy.ndarray]]:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute('''
                                                SELECT * FROM page WHERE archive_id = %s ORDER BY page_no ASC
-                                               ''', (archive_id,))).fetchall()
-            for i in range(len(rows)):
-                rows[i][2] = _convert_embedding(rows[i][2])
+                                               ''', (archive_id,), prepare=True)).fetchall()
             return rows
 
     async def get_count_pages_by_archive_id(self, archive_id: str) -> int:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute('''
                                                SELECT COUNT(*) FROM page WHERE archive_id = %s
-                                               ''', (archive_id,))).fetchone()
+                                               ''', (archive_id,), prepare=True)).fetchone()
             return rows[0]
 
-    async def get_embeddings_by_archive_id(self, archive_id: str) -> List[List[float]]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+    async def get_embeddings_by_archive_id(self, archive_id: str) -> List[numpy.ndarray]:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute(
-                'SELECT embedding FROM page WHERE archive_id = %s ORDER BY page_no ASC', (archive_id,)
+                'SELECT embedding FROM page WHERE archive_id = %s ORDER BY page_no ASC', (archive_id,), prepare=True
             )).fetchall()
-            for i in range(len(rows)):
-                rows[i] = _convert_embedding(rows[i][0])
-            return rows
+            return [row[0] for row in rows]
 
     async def get_pages_by_embedding_and_cosine_dist(
-            self, embedding: Union[str, List[float]], min_similarity: float=0.95, page_no: int=None, exclude_arcid: str=None
-    ) -> List[Tuple[str, str, List[float]]]:
+            self, embedding: Union[str, List[float]], min_similarity: float=0.95, page_no: int=None, exclude_arcid: str=None,
+            limit: int=_HNSW_EF_SEARCH
+    ) -> List[Tuple[str, int, numpy.ndarray]]:
+        """
+        Get up to `limit` pages nearest to the embedding whose cosine similarity is at least min_similarity,
+        nearest first. The nearest-neighbor ORDER BY ... LIMIT is what lets the HNSW index serve the query.
+        """
         max_distance = 1 - min_similarity
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
-            rows = None
-            if page_no and exclude_arcid:
-                rows = await (
-                    await cursor.execute(
-                        'SELECT * FROM page WHERE embedding <=> %s <= %s AND page_no = %s AND archive_id != %s',
-                        (embedding, max_distance, page_no, exclude_arcid)
-                    )
-                ).fetchall()
-            elif page_no:
-                rows = await (
-                    await cursor.execute(
-                        'SELECT * FROM page WHERE embedding <=> %s <= %s AND page_no = %s',
-                        (embedding, max_distance, page_no)
-                    )
-                ).fetchall()
-            elif exclude_arcid:
-                rows = await (
-                    await cursor.execute(
-                        'SELECT * FROM page WHERE embedding <=> %s <= %s AND archive_id != %s',
-                        (embedding, max_distance, exclude_arcid)
-                    )
-                ).fetchall()
-            else:
-                rows = await (
-                    await cursor.execute(
-                        'SELECT * FROM page WHERE embedding <=> %s <= %s',
-                        (embedding, max_distance)
-                    )
-                ).fetchall()
-            for i in range(rows):
-                rows[i][2] = _convert_embedding(rows[i][2])
+        if not isinstance(embedding, str):
+            embedding = numpy.asarray(embedding, dtype=numpy.float32)
+        conditions = ['embedding <=> %(embedding)s::vector <= %(max_distance)s']
+        if page_no:
+            conditions.append('page_no = %(page_no)s')
+        if exclude_arcid:
+            conditions.append('archive_id != %(exclude_arcid)s')
+        query = f'''
+        SELECT * FROM page
+        WHERE {' AND '.join(conditions)}
+        ORDER BY embedding::halfvec({self.embedding_dim}) <=> %(embedding)s::halfvec({self.embedding_dim})
+        LIMIT %(limit)s
+        '''
+        params = {'embedding': embedding, 'max_distance': max_distance, 'page_no': page_no, 'exclude_arcid': exclude_arcid, 'limit': limit}
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+            await cursor.execute(f'SET LOCAL hnsw.ef_search = {min(max(limit, _HNSW_EF_SEARCH), _HNSW_EF_SEARCH_MAX)}')
+            rows = await (await cursor.execute(query, params, prepare=True)).fetchall()
             return rows
 
     @overload
@@ -541,31 +748,33 @@ class PostgresDatabaseService:
         ...
 
     async def insert_page(self, archive_id: str, page_no: int, embedding: Union[str, List[float]]):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        if not isinstance(embedding, str):
+            embedding = normalize_embedding(embedding)
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute(
                 '''
                 INSERT INTO page (archive_id, page_no, embedding)
                 VALUES (%s, %s, %s)
                 ON CONFLICT (archive_id, page_no)
                 DO NOTHING
-                ''', (archive_id, page_no, embedding)
+                ''', (archive_id, page_no, embedding), prepare=True
             )
 
-    async def insert_pages(self, page_items: List[Tuple[str, int, str]]):
+    async def insert_pages(self, page_items: List[Tuple[str, int, List[float]]]):
         """
         Takes a list of page items (archive_id, page_no, embedding) and uploads them as rows into the page
-        table.
+        table. Embeddings are stored L2-normalized.
         """
-        async with await self.get_connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
-            await cursor.executemany('''
-                                     INSERT INTO page (archive_id, page_no, embedding)
-                                     VALUES (%s, %s, %s)
-                                     ON CONFLICT (archive_id, page_no)
-                                     DO NOTHING
-                                     ''', page_items)
+        if not page_items:
+            return
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+            await self._copy_insert_ignore_conflicts(
+                cursor, 'page', '(archive_id, page_no, embedding)', ['varchar', 'int4', 'vector'],
+                ((item[0], item[1], normalize_embedding(item[2])) for item in page_items)
+            )
 
     async def delete_page_by_archive_id(self, archive_id: str):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('DELETE FROM page WHERE archive_id = %s', (archive_id,))
 
     # <<<<< PAGE CRUD <<<<<
@@ -573,7 +782,7 @@ class PostgresDatabaseService:
     # >>>>> PROPER SUBARCHIVE CRUD >>>>>
 
     async def get_proper_subarchive(self, archive_id: str) -> Union[Tuple[str, str], None]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('''
                                               SELECT * FROM subarchive_map WHERE archive_id = %s
                                               ''', (archive_id,))).fetchone()
@@ -589,48 +798,61 @@ class PostgresDatabaseService:
         A "root" or "max" of a key "S" is obtained by following the sequence
         of rows in the database, (S, S1) -> (S1, S2) -> ... until a value (Sn, T) is obtained
         such that either (T, *) does not exist or (T, T) exists.
+
+        Walks the chain one row at a time (its depth is usually small), then compresses it by
+        pointing every visited row directly at the root. Returns None if (S, *) does not exist,
+        or if the chain runs into a cycle, which is logged and left untouched.
         """
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
-            row = await (await cursor.execute('''
-                                        WITH RECURSIVE chain AS (
-                                            SELECT archive_id, leq FROM subarchive_map
-                                            UNION ALL
-                                            SELECT c.archive_id, psm.leq
-                                            FROM chain AS c
-                                            JOIN subarchive_map AS psm
-                                            ON c.leq = psm.archive_id
-                                            WHERE psm.archive_id <> psm.leq
-                                        )
-                                        SELECT DISTINCT ON (archive_id) archive_id, leq AS root
-                                        FROM chain c
-                                        WHERE NOT EXISTS (
-                                            SELECT 1 FROM subarchive_map psm
-                                            WHERE psm.archive_id = psm.leq
-                                            AND psm.archive_id <> psm.leq
-                                        )
-                                        ORDER BY archive_id
-                                        ''')).fetchone()
-            if row:
-                return row[0]
-            return row
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+            path: List[str] = []
+            visited: Set[str] = set()
+            current = archive_id
+            while True:
+                if current in visited:
+                    LOGGER.error(f"[{archive_id}] Subarchive map contains a cycle: {' -> '.join(path + [current])}")
+                    return None
+                visited.add(current)
+                row = await (await cursor.execute(
+                    'SELECT leq FROM subarchive_map WHERE archive_id = %s', (current,), prepare=True
+                )).fetchone()
+                if not row:
+                    break
+                path.append(current)
+                if row[0] == current:
+                    break
+                current = row[0]
+            if not path:
+                return None
+            root = current
+            if len(path) > 1:
+                await cursor.execute(
+                    'UPDATE subarchive_map SET leq = %s WHERE archive_id = ANY(%s) AND leq <> %s', (root, path, root)
+                )
+            return root
 
     async def get_subarchive_map_children_by_archive_id(self, archive_id: str) -> List[str]:
         'get depth 1' # TODO: get all children
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute('''
                                                SELECT archive_id FROM subarchive_map WHERE leq = %s AND archive_id != %s
                                                ''', (archive_id, archive_id))).fetchall()
             return [r[0] for r in rows]
 
     async def get_duplicate_archives(self) -> List[str]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute('SELECT archive_id FROM subarchive_map WHERE archive_id != leq')).fetchall()
-            for i in range(len(rows)):
-                rows[i] = rows[i][0]
-            return rows
+            return [r[0] for r in rows]
+
+    async def iter_duplicate_archives(self) -> AsyncIterator[str]:
+        """
+        Yield duplicate archive IDs as rows arrive, without loading the whole result set.
+        """
+        async with self.connection() as aconn, aconn.cursor() as cursor:
+            async for row in cursor.stream('SELECT archive_id FROM subarchive_map WHERE archive_id != leq'):
+                yield row[0]
 
     async def insert_subarchive_map(self, archive_id: str, leq: str):
-        async with await self.get_connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
             await cursor.execute('''
                                  INSERT INTO subarchive_map (archive_id, leq)
                                  VALUES (%s, %s)
@@ -639,7 +861,7 @@ class PostgresDatabaseService:
                                  ''', (archive_id, leq))
 
     async def update_subarchive_map(self, archive_id: str, leq: str):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 UPDATE subarchive_map
                                 SET archive_id = %s, leq = %s
@@ -647,13 +869,13 @@ class PostgresDatabaseService:
                                 ''', (archive_id, leq))
     
     async def delete_subarchive_map(self, archive_id: str):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 DELETE FROM subarchive_map WHERE archive_id = %s
                                 ''', (archive_id,))
             
     async def delete_subarchive_map_children(self, archive_id: str):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 DELETE FROM subarchive_map WHERE leq = %s AND archive_id != %s
                                 ''', (archive_id, archive_id))
@@ -662,14 +884,14 @@ class PostgresDatabaseService:
 
     # >>>>> NHENTAI ARCHIVE CRUD >>>>>
     async def get_nhentai_archive_favorites(self, archive_id: str) -> int:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('SELECT favorites FROM nhentai_archive WHERE archive_id = %s', (archive_id,))).fetchone()
             if row:
                 return row[0]
             return 0
 
     async def get_nhentai_archive(self, archive_id: str) -> Union[Tuple[str, str, int, NhArchiveLanguage, float], None]:
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             row = await (await cursor.execute('''
                                                SELECT 
                                                archive_id, nhentai_id, favorites, language, last_updated
@@ -683,7 +905,7 @@ class PostgresDatabaseService:
         Get nhentai archives by favorites (e.g. -1) for tasks like updating favorites for an archive.
         These archive IDs must not already exist in the metadata tasks database.
         """
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute('''
                                                SELECT archive_id, nhentai_id, favorites, language, last_updated
                                                FROM nhentai_archive nha
@@ -698,25 +920,23 @@ class PostgresDatabaseService:
     async def get_nhentai_archive_metadata_tasks_by_status(
             self, statuses: List[MetadataPluginStatus], limit: int=None
     ) -> List[Tuple[str, str, int, NhArchiveLanguage, float]]:
-        statuses_formatted = ", ".join(f"'{status.name}'" for status in statuses)
-        query = f'''
-        SELECT archive_id, nhentai_id, favorites, language, last_updated
+        # archive_id is the primary key of archive_metadata_job, so the join yields each archive at most once.
+        query = '''
+        SELECT nha.archive_id, nha.nhentai_id, nha.favorites, nha.language, nha.last_updated
         FROM nhentai_archive nha
-        WHERE EXISTS (
-        SELECT 1 FROM archive_metadata_job amj 
-        WHERE amj.status IN ({statuses_formatted}) AND amj.archive_id = nha.archive_id
-        )
+        JOIN archive_metadata_job amj ON amj.archive_id = nha.archive_id
+        WHERE amj.status = ANY(%s)
         '''
-        params = []
+        params = [[status.name for status in statuses]]
         if limit is not None:
             query += ' LIMIT %s'
             params.append(limit)
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute(query, params=params)).fetchall()
             return rows
 
     async def insert_nhentai_archive(self, archive_id: str, nhentai_id: str, favorites: int, language: NhArchiveLanguage):
-        async with await self.get_connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
             await cursor.execute('''
                                  INSERT INTO nhentai_archive (archive_id, nhentai_id, favorites, language, last_updated)
                                  VALUES (%s, %s, %s, %s, %s)
@@ -725,7 +945,7 @@ class PostgresDatabaseService:
                                  ''', (archive_id, nhentai_id, favorites, language.name, time.time()))
 
     async def update_nhentai_archive_favorites(self, archive_id: str, favorites: int):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 UPDATE nhentai_archive
                                 SET archive_id = %s, favorites = %s, last_updated = %s
@@ -733,7 +953,7 @@ class PostgresDatabaseService:
                                 ''', (archive_id, favorites, time.time(), archive_id))
     
     async def delete_nhentai_archive(self, archive_id: str):
-        async with await self.get_connection() as aconn, aconn.transaction():
+        async with self.connection() as aconn, aconn.transaction():
             await aconn.execute('''
                                 DELETE FROM subarchive_map WHERE archive_id = %s
                                 ''', (archive_id,))
@@ -741,59 +961,67 @@ class PostgresDatabaseService:
     # <<<<< NHENTAI ARCHIVE CRUD <<<<<
 
     # >>>>> COMPOSITE METHODS >>>>>
-    async def get_arcids_by_similar_first_page(self, archive_id: str, min_similarity: float=0.95, restrict_language: bool=False) -> List[str]:
+    async def _get_arcids_near_first_page(
+            self, archive_id: str, min_similarity: float, restrict_language: bool, first_pages_only: bool, limit: int
+    ) -> List[str]:
         """
-        Get all archives with similar first pages as the provided archive ID, (potentially restricted to same language)
-        as given in nhentai_archive table.
+        Approximate nearest-neighbor search for the pages closest to the given archive's first page, through
+        the HNSW index: the index can only serve a plain `ORDER BY <distance> LIMIT k`, so the distance cutoff,
+        nhentai_archive join and language filter are applied to the `limit` nearest pages afterwards.
         """
         max_distance = 1 - min_similarity
-        query = """
-        SELECT p2.archive_id
-        FROM page p1
-        JOIN nhentai_archive na1 ON na1.archive_id = p1.archive_id
-        JOIN page p2 ON p2.page_no = 1
-        JOIN nhentai_archive na2 ON na2.archive_id = p2.archive_id
-        WHERE p1.archive_id = %s
-        AND p1.page_no = 1
-        AND p2.archive_id <> na1.archive_id
-        AND (p1.embedding <=> p2.embedding) < %s
+        async with self.connection() as aconn, aconn.transaction(), aconn.cursor() as cursor:
+            anchor = await (await cursor.execute('''
+                                                 SELECT p.embedding, na.language
+                                                 FROM page p
+                                                 JOIN nhentai_archive na ON na.archive_id = p.archive_id
+                                                 WHERE p.archive_id = %s AND p.page_no = 1
+                                                 ''', (archive_id,), prepare=True)).fetchone()
+            if not anchor:
+                return []
+            embedding, language = anchor
+            # the page_no = 1 predicate is written out so the planner can match the partial first-page index.
+            page_filter = 'AND page_no = 1' if first_pages_only else ''
+            language_filter = 'AND na2.language = %(language)s' if restrict_language else ''
+            query = f'''
+            SELECT DISTINCT nn.archive_id
+            FROM (
+                SELECT archive_id, embedding <=> %(embedding)s AS distance
+                FROM page
+                WHERE archive_id <> %(archive_id)s {page_filter}
+                ORDER BY embedding::halfvec({self.embedding_dim}) <=> %(embedding)s::halfvec({self.embedding_dim})
+                LIMIT %(limit)s
+            ) nn
+            JOIN nhentai_archive na2 ON na2.archive_id = nn.archive_id
+            WHERE nn.distance < %(max_distance)s {language_filter}
+            '''
+            params = {'embedding': embedding, 'archive_id': archive_id, 'limit': limit, 'max_distance': max_distance, 'language': language}
+            await cursor.execute(f'SET LOCAL hnsw.ef_search = {min(max(limit, _HNSW_EF_SEARCH), _HNSW_EF_SEARCH_MAX)}')
+            rows = await (await cursor.execute(query, params, prepare=True)).fetchall()
+            return [r[0] for r in rows]
+
+    async def get_arcids_by_similar_first_page(
+            self, archive_id: str, min_similarity: float=0.95, restrict_language: bool=False, limit: int=_FIRST_PAGE_NEIGHBORS
+    ) -> List[str]:
         """
-        if restrict_language:
-            query += " AND na2.language = na1.language"
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
-            rows = await (await cursor.execute(query, (archive_id, max_distance))).fetchall()
-            for i in range(len(rows)):
-                rows[i] = rows[i][0]
-            return rows
+        Get all archives with similar first pages as the provided archive ID, (potentially restricted to same language)
+        as given in nhentai_archive table. Considers the `limit` nearest first pages.
+        """
+        return await self._get_arcids_near_first_page(archive_id, min_similarity, restrict_language, True, limit)
 
     async def get_arcids_by_page_similar_to_first_page_2(
         self,
         archive_id: str,
         min_similarity: float = 0.95,
-        restrict_language: bool = False
+        restrict_language: bool = False,
+        limit: int = _FIRST_PAGE_NEIGHBORS
     ) -> List[str]:
         """
         Gets all page.archive_id whose (page.embedding <=> the given archive's first-page embedding) < max_distance,
         for some page in that archive. The 'restrict_language' flag ensures we only pick archives with the
-        same language as the given archive.
+        same language as the given archive. Considers the `limit` nearest pages.
         """
-        max_distance = 1 - min_similarity
-        query = """
-            SELECT DISTINCT p2.archive_id
-            FROM page p1
-            JOIN nhentai_archive na1    ON na1.archive_id = p1.archive_id
-            JOIN page p2                ON p2.archive_id <> p1.archive_id
-            JOIN nhentai_archive na2    ON na2.archive_id = p2.archive_id
-            WHERE p1.archive_id = %s
-            AND p1.page_no = 1
-            AND (p1.embedding <=> p2.embedding) < %s
-        """
-        if restrict_language:
-            query += " AND na2.language = na1.language"
-
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
-            rows = await (await cursor.execute(query, (archive_id, max_distance))).fetchall()
-            return [r[0] for r in rows]
+        return await self._get_arcids_near_first_page(archive_id, min_similarity, restrict_language, False, limit)
 
     async def get_archives_not_in_subarchive_map(
             self, language: NhArchiveLanguage=None, limit: int=None
@@ -803,7 +1031,7 @@ class PostgresDatabaseService:
         have been inserted to the database successfully.
         """
         embedding_job_statuses = [ArchiveEmbeddingJobStatus.SKIPPED, ArchiveEmbeddingJobStatus.SUCCESS]
-        embedding_job_filter = " AND archive_embedding_job.status IN (" + ', '.join(f"'{status.name}'" for status in embedding_job_statuses) + ")"
+        embedding_job_filter = " AND archive_embedding_job.status IN (" + ', '.join(str(status.value) for status in embedding_job_statuses) + ")"
 
         query = f'''
         SELECT archive_id
@@ -822,7 +1050,7 @@ class PostgresDatabaseService:
         if limit is not None:
             query += ' LIMIT %s'
             params.append(limit)
-        async with await self.get_connection() as aconn, aconn.cursor() as cursor:
+        async with self.connection() as aconn, aconn.cursor() as cursor:
             rows = await (await cursor.execute(query, params)).fetchall()
             rows = [r[0] for r in rows]
             return rows
@@ -841,12 +1069,15 @@ class DeduplicationService:
     def __init__(
             self, lrr: LRRClient, db: PostgresDatabaseService, img2vec: Img2VecClient, img2vec_workers: int, 
             nhentai_archivist_dndm: Path=None, lrr_contents_dir: Path=None,
-            logger: logging.Logger=None
+            logger: logging.Logger=None, img2vec_batch_size: int=DEFAULT_IMG2VEC_BATCH_SIZE
     ):
         self.lrr = lrr
+        # the LANraragi client, database pool and img2vec client may be shared with the server; they are only closed if created here.
+        self._owns_clients = False
         self.db = db
         self.img2vec = img2vec
         self.img2vec_semaphore = asyncio.Semaphore(value=img2vec_workers) # when creating embeddings, will reach out to img2vec services.
+        self.img2vec_batch_size = img2vec_batch_size # images per embeddings-batch request, i.e. per img2vec forward pass.
 
         self.nhentai_archivist_dndm = nhentai_archivist_dndm
         self.lrr_contents_dir = lrr_contents_dir
@@ -867,17 +1098,19 @@ class DeduplicationService:
         )
         img2vec = Img2VecClient(os.getenv("IMG2VEC_HOST"))
         img2vec_workers = int(os.getenv("IMG2VEC_WORKERS"))
+        img2vec_batch_size = int(os.getenv("IMG2VEC_BATCH_SIZE", DEFAULT_IMG2VEC_BATCH_SIZE))
         donotdownloadme_path = os.getenv("NHENTAI_ARCHIVIST_DONOTDOWNLOADME_PATH")
         if donotdownloadme_path:
             donotdownloadme_path = Path(donotdownloadme_path)
-        return DeduplicationService(lanraragi, db, img2vec, img2vec_workers, donotdownloadme_path)
+        service = DeduplicationService(lanraragi, db, img2vec, img2vec_workers, donotdownloadme_path, img2vec_batch_size=img2vec_batch_size)
+        service._owns_clients = True
+        return service
     
     async def close(self):
-        if self.lrr.session and not self.lrr.session.closed:
-            await self.lrr.session.close()
-        await self.db.close()
-        await self.lrr.close()
-        await self.img2vec.close()
+        if self._owns_clients:
+            await self.db.close()
+            await self.lrr.close()
+            await self.img2vec.close()
 
     # >>>>> CREATE EMBEDDING METHODS >>>>>
     async def create_pages_from_arcid(
@@ -939,20 +1172,8 @@ class DeduplicationService:
 
                 page_items = []
                 self.logger.debug(f"[{archive_id}] Extracting pages.")
-                image_page_pairs: List[Tuple[PIL.Image.Image, int]] = []
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    tmpdirp = Path(tmpdir)
-                    archive_path = tmpdirp / "extracted.zip"
-                    with open(archive_path, 'wb') as writer:
-                        writer.write(resp.data.getvalue())
-                    extracted_folder = tmpdirp / "images"
-                    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                        zip_ref.extractall(extracted_folder)
-                    images = sorted(f for f in extracted_folder.iterdir() if f.suffix.lower() in {".png", ".jpg", "jpeg"})
-                    for i, image in enumerate(images):
-                        image = PIL.Image.open(image).convert('RGB')
-                        page_no = i + 1
-                        image_page_pairs.append((image, page_no))
+                # the archive is already in memory; decode pages straight from it, off the event loop.
+                image_page_pairs = await asyncio.to_thread(_decode_archive_pages, resp.data)
                 
                 self.logger.debug(f"[{archive_id}] Processing {len(image_page_pairs)} images.")
 
@@ -962,7 +1183,7 @@ class DeduplicationService:
 
                 # batching ver.
                 if use_batched:
-                    img2vec_batch_size = 4
+                    img2vec_batch_size = self.img2vec_batch_size
                     for i in range(0, len(image_page_pairs), img2vec_batch_size):
                         batch = image_page_pairs[i:i+img2vec_batch_size]
                         tasks.append(asyncio.create_task(create_embedding_page_no_pairs(batch)))
@@ -994,8 +1215,8 @@ class DeduplicationService:
                 else:
                     self.logger.error(f"[{archive_id}] Failed to connect to database! Cannot continue.")
                     raise operational_error
-            except OSError as os_error:
-                self.logger.error(f"[{archive_id}] An error occurred while handling archive.", os_error)
+            except OSError:
+                self.logger.exception(f"[{archive_id}] An error occurred while handling archive.")
                 message = traceback.format_exc()
                 response.status = ArchiveEmbeddingJobStatus.FAILED
                 await update_embedding_job(archive_id, response.status.name, message=message)
@@ -1059,8 +1280,6 @@ class DeduplicationService:
         Get all archive IDs with pending status, and create embeddings out of every page
         and store them to postgres.
         """
-        dl_semaphore = asyncio.Semaphore(value=download_concurrency)
-
         aej_list = []
         remaining = max_tasks
         while True:
@@ -1072,15 +1291,14 @@ class DeduplicationService:
                 remaining -= num_archives
             if not aej_list:
                 break
-            async def __consume_embedding_task(archive_id: str, i: int, total_archives: int):
-                async with dl_semaphore:
+            # a fixed pool of workers pulls jobs from the batch, rather than one pending coroutine per job.
+            jobs = enumerate(aej_list)
+            async def __consume_embedding_tasks(total_archives: int):
+                for i, aej in jobs:
+                    archive_id = aej[0]
                     response = await self.create_pages_from_arcid(archive_id, is_dry_run=is_dry_run)
                     self.logger.info(f"[{i+1}/{total_archives}][{archive_id}] embedding job status = {response.status.name}; pages = {response.pages}")
-            tasks = []
-            for i, aej in enumerate(aej_list):
-                archive_id = aej[0]
-                tasks.append(__consume_embedding_task(archive_id, i, num_archives))
-            await asyncio.gather(*tasks)
+            await asyncio.gather(*[__consume_embedding_tasks(num_archives) for _ in range(download_concurrency)])
         self.logger.info("PENDING tasks have been processed.")
 
     # <<<<< CREATE EMBEDDING METHODS <<<<<
@@ -1321,7 +1539,7 @@ class DeduplicationService:
             archive_id_2: keep_reasons_2
         }
 
-    async def compute_subarchives(self, separate_languages: bool=True):
+    async def compute_subarchives(self, separate_languages: bool=True, min_similarity: float=0.95):
         """
         Go over every archive A for which (A, *) does not exist and calulate its (A, *).
         Incidentally, also calculate all B for which A and B share similar first pages.
@@ -1331,6 +1549,9 @@ class DeduplicationService:
 
         separate_languages: if True, computes subarchives wrt a specific language
 
+        min_similarity: cosine similarity above which two pages are considered the same. It is used both to find
+        candidate archives (by first page, through the page index) and to verify them page by page.
+
         Just a warning, I have NO idea what subarchive behavior is like if you
         run compute_subarchives multiple times. If you want to run this, clear the subarchives
         table and do it from scratch.
@@ -1358,7 +1579,9 @@ class DeduplicationService:
                     if mapping: # this archive has already been processed.
                         self.logger.info(f"[{language.name}][{i+1}/{num_archives}][{archive_id}] Already in database.")
                         return
-                    _archive_ids = await self.db.get_arcids_by_page_similar_to_first_page_2(archive_id, restrict_language=language is not None)
+                    _archive_ids = await self.db.get_arcids_by_page_similar_to_first_page_2(
+                        archive_id, min_similarity=min_similarity, restrict_language=language is not None
+                    )
                     self.logger.debug(f"[{archive_id}] Got archive IDs: {_archive_ids}")
 
                     curr_max_arcid = archive_id
@@ -1367,8 +1590,8 @@ class DeduplicationService:
                         if _mapping: # set A' = max(A').
                             _archive_id = _mapping[1]
                         (is_subarchive, is_proper_subarchive), (is_suparchive, is_proper_suparchive) = await asyncio.gather(
-                            asyncio.create_task(self.is_subarchive_of(curr_max_arcid, _archive_id)),    # A < A'
-                            asyncio.create_task(self.is_subarchive_of(_archive_id, curr_max_arcid))     # A' < A
+                            asyncio.create_task(self.is_subarchive_of(curr_max_arcid, _archive_id, min_similarity=min_similarity)),    # A < A'
+                            asyncio.create_task(self.is_subarchive_of(_archive_id, curr_max_arcid, min_similarity=min_similarity))     # A' < A
                         )
 
                         keep_current = False
@@ -1434,6 +1657,21 @@ class DeduplicationService:
         """
         return await self.db.get_duplicate_archives()
     
+    async def get_subarchive_info(self, archive_id: str) -> Tuple[bool, Union[str, None]]:
+        """
+        Get whether an archive is a duplicate, and the archive it is a duplicate of (if any).
+        """
+        row = await self.db.get_proper_subarchive(archive_id)
+        if row is None or row[1] == archive_id:
+            return False, None
+        return True, row[1]
+
+    def iter_duplicate_archives(self) -> AsyncIterator[str]:
+        """
+        Stream all duplicate archives.
+        """
+        return self.db.iter_duplicate_archives()
+
     async def remove_duplicate_archives_nhentai_archivist(
             self, lrr_concurrent_connections: int=4, is_dry_run: bool=False
     ) -> NhentaiArchivistDeduplicationResponse:
@@ -1511,7 +1749,7 @@ class DeduplicationService:
         response = NhentaiArchivistDeduplicationResponse()
         delete_start = time.time()
         to_delete = {int(nhid) for nhid in nhentai_ids}
-        all_archives = discover_all_archives_in_folder(self.lrr_contents_dir)
+        all_archives = await asyncio.to_thread(discover_all_archives_in_folder, self.lrr_contents_dir)
         contents_size_bytes = 0
         deleted_size_bytes = 0
         deleted_count = 0
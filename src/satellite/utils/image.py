@@ -2,7 +2,6 @@
 Image analysis library.
 """
 from pathlib import Path
-import tempfile
 from typing import overload, Union
 import zipfile
 
@@ -12,26 +11,34 @@ def image_is_incomplete_bytes(image: Union[str, Path, bytes]):
     Returns True if the image is incomplete (truncated/corrupted), or False if it is complete.
     Supported formats: JPEG, PNG, TIFF.
     """
+    if isinstance(image, bytes):
+        if not image:
+            return True
+        return __is_incomplete(image[:8], image[-8:], "<bytes>")
     # Accept str or Path for the file path
     if not isinstance(image, (str, Path)):
-        raise TypeError(f"Expected a file path (str or Path), got {type(image)}")
+        raise TypeError(f"Expected a file path (str or Path) or bytes, got {type(image)}")
     path = Path(image)
     with path.open("rb") as f:
         file_size = path.stat().st_size
         if file_size == 0:
             return True
         header = f.read(8)
-        if header[:2] == b'\xFF\xD8': # JPG
-            f.seek(file_size - 2)
-            eof_bytes = f.read(2)
-            return eof_bytes != b'\xFF\xD9'
-        elif header[:8] == b'\x89PNG\r\n\x1a\n': # PNG
-            f.seek(file_size - 8)
-            eof_bytes = f.read(8)
-            expected_png_eof = b'\x49\x45\x4E\x44\xAE\x42\x60\x82'
-            return eof_bytes != expected_png_eof
-        else:
-            raise TypeError(f"Expected JPEG, PNG or TIFF file: {image}")
+        f.seek(max(file_size - 8, 0))
+        tail = f.read(8)
+        return __is_incomplete(header, tail, image)
+
+def __is_incomplete(header: bytes, tail: bytes, image: Union[str, Path]) -> bool:
+    """
+    Check the end-of-image marker matching the format in the header.
+    """
+    if header[:2] == b'\xFF\xD8': # JPG
+        return tail[-2:] != b'\xFF\xD9'
+    elif header[:8] == b'\x89PNG\r\n\x1a\n': # PNG
+        expected_png_eof = b'\x49\x45\x4E\x44\xAE\x42\x60\x82'
+        return tail[-8:] != expected_png_eof
+    else:
+        raise TypeError(f"Expected JPEG, PNG or TIFF file: {image}")
 
 @overload
 def archive_contains_incomplete_image(archive_path: str) -> bool:
@@ -51,11 +58,12 @@ def archive_contains_incomplete_image(archive_path: Union[Path, str]) -> bool:
         # non-zip archives are currently not supported.
         return True
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        extracted_archive_folder = Path(tmpdir) / archive_path.name
-        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-            zip_ref.extractall(extracted_archive_folder)
-            for image in extracted_archive_folder.iterdir():
-                if image.suffix.lower() in {".png", ".jpg", ".jpeg"} and image_is_incomplete_bytes(image):
-                    return True
+    # images are read straight out of the archive rather than extracted to disk first.
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            # only top-level files are checked.
+            if info.is_dir() or '/' in info.filename:
+                continue
+            if Path(info.filename).suffix.lower() in {".png", ".jpg", ".jpeg"} and image_is_incomplete_bytes(zip_ref.read(info)):
+                return True
     return False
@@ -0,0 +1,38 @@
+from contextlib import asynccontextmanager
+import os
+
+import aiohttp
+import pytest
+
+from lanraragi.client import LRRClient
+
+
+class _FailingContent:
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def iter_chunked(self, _):
+        for chunk in self.chunks:
+            yield chunk
+        raise aiohttp.ClientPayloadError("connection dropped mid-download")
+
+class _FailingResponse:
+
+    def __init__(self, chunks):
+        self.content = _FailingContent(chunks)
+
+@pytest.mark.asyncio
+async def test_download_archive_to_failure_leaves_no_file(monkeypatch, tmp_path):
+    @asynccontextmanager
+    async def _open_download(archive_id, response):
+        response.status_code = 200
+        response.success = 1
+        yield _FailingResponse([b"x" * 1024])
+
+    client = LRRClient(lrr_host="http://localhost:3000", lrr_api_key="lanraragi")
+    monkeypatch.setattr(client, "_open_download", _open_download)
+    with pytest.raises(aiohttp.ClientPayloadError):
+        await client.download_archive_to("0" * 40, tmp_path / "archive.cbz")
+    # neither the truncated archive nor its .part file is left behind
+    assert os.listdir(tmp_path) == []
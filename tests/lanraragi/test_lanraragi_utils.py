@@ -0,0 +1,48 @@
+import hashlib
+import io
+from pathlib import Path
+import tempfile
+
+import pytest
+
+from lanraragi.utils import compute_archive_id, compute_archive_ids, compute_upload_checksum, compute_upload_checksums
+
+
+def test_compute_upload_checksum():
+    data = bytes(range(256)) * 1000
+    expected_checksum = hashlib.sha1(data).hexdigest()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = Path(tmpdir) / "archive.cbz"
+        archive_path.write_bytes(data)
+        assert compute_upload_checksum(archive_path) == expected_checksum
+        assert compute_upload_checksum(str(archive_path)) == expected_checksum
+    assert compute_upload_checksum(io.BytesIO(data)) == expected_checksum
+
+def test_compute_upload_checksum_partially_read_stream():
+    data = bytes(range(256)) * 1000
+    stream = io.BytesIO(data)
+    stream.read(1000)
+    assert compute_upload_checksum(stream) == hashlib.sha1(data[1000:]).hexdigest()
+
+def test_compute_archive_id():
+    data = bytes(range(256)) * 4000
+    expected_id = hashlib.sha1(data[:512000]).hexdigest()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = Path(tmpdir) / "archive.cbz"
+        archive_path.write_bytes(data)
+        assert compute_archive_id(archive_path) == expected_id
+
+        empty_path = Path(tmpdir) / "empty.cbz"
+        empty_path.touch()
+        with pytest.raises(ValueError):
+            compute_archive_id(empty_path)
+
+def test_compute_many():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_paths = []
+        for i in range(8):
+            archive_path = Path(tmpdir) / f"archive-{i}.cbz"
+            archive_path.write_bytes(bytes([i]) * (100000 * i + 1))
+            archive_paths.append(archive_path)
+        assert compute_archive_ids(archive_paths) == [compute_archive_id(path) for path in archive_paths]
+        assert compute_upload_checksums(archive_paths) == [compute_upload_checksum(path) for path in archive_paths]
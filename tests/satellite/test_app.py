@@ -0,0 +1,24 @@
+import pytest
+
+from satellite.server.app import app, lifespan
+from satellite.server.dependencies.common import get_config
+
+@pytest.mark.asyncio
+async def test_lifespan_with_empty_lrr_api_key(monkeypatch, tmp_path):
+    """
+    An empty LRR_API_KEY (a LANraragi server without authentication) must not stop the server from starting.
+    """
+    monkeypatch.setenv("SATELLITE_HOME", str(tmp_path))
+    monkeypatch.setenv("LRR_HOST", "http://localhost:3000")
+    monkeypatch.setenv("LRR_API_KEY", "")
+    monkeypatch.delenv("SATELLITE_API_KEY", raising=False)
+    monkeypatch.delenv("LRR_CONTENTS_DIR", raising=False)
+    monkeypatch.delenv("IMG2VEC_HOST", raising=False)
+    get_config.cache_clear()
+    try:
+        async with lifespan(app):
+            client = app.state.lrr_client
+            assert client is not None
+            assert "Authorization" not in client.headers
+    finally:
+        get_config.cache_clear()
@@ -0,0 +1,13 @@
+import inspect
+from typing import get_args
+
+from satellite.server.dependencies import common, database, metadata
+
+def test_dependencies_are_async():
+    """
+    Request dependencies do no blocking work, so they must be `async def` to avoid a threadpool hop per request.
+    """
+    aliases = [common.LoggerT, common.ConfigT, common.LRRClientT, common.LRRContentsDirT, database.DatabaseServiceT, metadata.NhentaiArchivistMetadataServiceT, metadata.PixivUtilMetadataServiceT]
+    for alias in aliases:
+        dependency = get_args(alias)[1].dependency
+        assert inspect.iscoroutinefunction(dependency), f"{dependency.__name__} is not async."
@@ -0,0 +1,23 @@
+from fastapi import BackgroundTasks
+import pytest
+
+from satellite.server.services.locks import BACKGROUND_TASK_LIMIT, LockState, queue_background_task
+
+@pytest.mark.asyncio
+async def test_queue_background_task_refuses_when_slots_are_busy():
+    """
+    A job is only queued if a slot is free, and its slot is released once it has run.
+    """
+    lock_state = LockState()
+    background_tasks = BackgroundTasks()
+    results = []
+    async def task(i: int):
+        results.append(i)
+
+    for i in range(BACKGROUND_TASK_LIMIT):
+        assert await queue_background_task(background_tasks, lock_state, task, i)
+    assert not await queue_background_task(background_tasks, lock_state, task, BACKGROUND_TASK_LIMIT)
+
+    await background_tasks()
+    assert results == list(range(BACKGROUND_TASK_LIMIT))
+    assert await queue_background_task(BackgroundTasks(), lock_state, task, BACKGROUND_TASK_LIMIT)
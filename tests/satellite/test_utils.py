@@ -2,9 +2,10 @@
 
 from pathlib import Path
 import tempfile
+import zipfile
 from manycbz.models import CreatePageRequest
-from manycbz.service.page import create_page, save_page_to_dir
-from satellite.utils.image import image_is_incomplete_bytes
+from manycbz.service.page import create_page, get_page_bytes, save_page_to_dir
+from satellite.utils.image import archive_contains_incomplete_image, image_is_incomplete_bytes
 
 def test_image_is_corrupted():
 
@@ -19,3 +20,19 @@ def test_image_is_corrupted():
         page = create_page(CreatePageRequest(1280, 1779, "corrupted_image.png", first_n_bytes=1000)).page
         save_page_to_dir(page, tmpdir)
         assert image_is_incomplete_bytes(tmpdir / page.filename), "Corrupted image is not flagged as corrupted!"
+
+def test_archive_contains_incomplete_image():
+
+    complete = get_page_bytes(CreatePageRequest(1280, 1779, "pg-1.png"))
+    incomplete = get_page_bytes(CreatePageRequest(1280, 1779, "pg-2.png", first_n_bytes=1000))
+    assert not image_is_incomplete_bytes(complete), "Uncorrupted image bytes are flagged as corrupted!"
+    assert image_is_incomplete_bytes(incomplete), "Corrupted image bytes are not flagged as corrupted!"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive_path = Path(tmpdir) / "archive.cbz"
+        with zipfile.ZipFile(archive_path, 'w') as zip_ref:
+            zip_ref.writestr("pg-1.png", complete)
+        assert not archive_contains_incomplete_image(archive_path), "Complete archive is flagged as corrupted!"
+        with zipfile.ZipFile(archive_path, 'a') as zip_ref:
+            zip_ref.writestr("pg-2.png", incomplete)
+        assert archive_contains_incomplete_image(archive_path), "Corrupted archive is not flagged as corrupted!"